@@ -29,7 +29,7 @@ class AsTextFileInput(forms.widgets.FileInput):
 #     }
 
 class AssignmentSubmissionFileAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'submission', 'content')
+    list_display = ('id', 'name', 'submission', 'content_hash', 'size')
 
 class AssignmentSubmissionCommentAdmin(admin.ModelAdmin):
     list_display = (
@@ -0,0 +1,124 @@
+"""Streaming extraction of uploaded zip and tar project archives.
+
+Members are read one at a time straight from the uploaded file (which
+Django spools to a temporary file once it is larger than
+FILE_UPLOAD_MAX_MEMORY_SIZE), so memory use is bounded by the per-file
+limit rather than the archive size.
+"""
+
+import posixpath
+import tarfile
+import zipfile
+import zlib
+
+from django.conf import settings
+
+# Bytes inspected when deciding whether a member is binary
+BINARY_SNIFF_SIZE = 8192
+
+IGNORED_PREFIXES = ('__MACOSX/',)
+IGNORED_NAMES = ('.DS_Store',)
+
+
+class ArchiveError(ValueError):
+    """Raised when an upload is not a readable zip or tar archive."""
+
+
+def _clean_name(name):
+    """Normalize a member path, or return None if it should be ignored."""
+    name = posixpath.normpath(name.replace('\\', '/')).lstrip('/')
+    if name in ('', '.', '..') or name.startswith('../') or name.startswith(IGNORED_PREFIXES):
+        return None
+    if posixpath.basename(name) in IGNORED_NAMES:
+        return None
+    return name
+
+
+def _zip_members(upload):
+    with zipfile.ZipFile(upload) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            yield info.filename, info.file_size, lambda info=info: archive.open(info)
+
+
+def _tar_members(upload):
+    with tarfile.open(fileobj=upload, mode='r:*') as archive:
+        for info in archive:
+            if not info.isfile():
+                continue
+            yield info.name, info.size, lambda info=info: archive.extractfile(info)
+
+
+def _members(upload):
+    upload.seek(0)
+    if zipfile.is_zipfile(upload):
+        upload.seek(0)
+        return _zip_members(upload)
+    upload.seek(0)
+    try:
+        tarfile.open(fileobj=upload, mode='r:*').close()
+    except tarfile.TarError:
+        raise ArchiveError('Upload is not a zip or tar archive')
+    upload.seek(0)
+    return _tar_members(upload)
+
+
+def iter_archive_files(upload, skipped, max_file_size=None, max_files=None):
+    """Yield (name, content) for every text file in an archive, one at a time.
+
+    Binary, non-UTF-8 and oversized members, and members beyond `max_files`,
+    are not yielded; each is recorded in `skipped` as {'name', 'reason'}.
+
+    Args:
+        upload: seekable binary file-like object holding a zip or tar archive
+        skipped: list to append skipped members to
+        max_file_size: largest member to accept, in bytes
+            (defaults to settings.SUBMISSION_ARCHIVE_MAX_FILE_SIZE)
+        max_files: most members to accept
+            (defaults to settings.SUBMISSION_ARCHIVE_MAX_FILES)
+
+    Raises:
+        ArchiveError: if the upload is not a zip or tar archive
+    """
+    if max_file_size is None:
+        max_file_size = settings.SUBMISSION_ARCHIVE_MAX_FILE_SIZE
+    if max_files is None:
+        max_files = settings.SUBMISSION_ARCHIVE_MAX_FILES
+
+    try:
+        yield from _iter_text_members(upload, skipped, max_file_size, max_files)
+    except (zipfile.BadZipFile, tarfile.TarError, zlib.error, EOFError) as e:
+        raise ArchiveError(f'Could not read archive: {e}')
+
+
+def _iter_text_members(upload, skipped, max_file_size, max_files):
+    accepted = 0
+    for raw_name, size, open_member in _members(upload):
+        name = _clean_name(raw_name)
+        if name is None:
+            continue
+        if accepted >= max_files:
+            skipped.append({'name': name, 'reason': 'too_many_files'})
+            continue
+        if size > max_file_size:
+            skipped.append({'name': name, 'reason': 'too_large'})
+            continue
+
+        with open_member() as member:
+            # Read at most one byte past the limit in case the header lied about the size
+            data = member.read(max_file_size + 1)
+        if len(data) > max_file_size:
+            skipped.append({'name': name, 'reason': 'too_large'})
+            continue
+        if b'\0' in data[:BINARY_SNIFF_SIZE]:
+            skipped.append({'name': name, 'reason': 'binary'})
+            continue
+        try:
+            content = data.decode('utf-8')
+        except UnicodeDecodeError:
+            skipped.append({'name': name, 'reason': 'binary'})
+            continue
+
+        accepted += 1
+        yield name, content
@@ -0,0 +1,99 @@
+"""Async versions of the hottest read endpoints, for the ASGI serving mode.
+
+These serve the same URLs and JSON as the DRF views in views.py, but load
+rows with Django's async ORM, so an ASGI server (see backend/asgi.py) can
+keep many slow clients waiting on the database without a thread each.
+They are routed by backend/asgi_urls.py, which asgi.py selects.
+
+Only plain GET and HEAD requests are handled here. Other methods and
+paginated requests (`?page_size=` / `?cursor=`) are handed to the DRF view
+for the same URL, so the API behaves the same under WSGI and ASGI.
+"""
+
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponseNotFound, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from .conditional import add_validators, check_conditions, class_assignments_version, submission_version
+from .models import Assignment, AssignmentSubmission, Class, User
+from .pagination import OptionalCursorPagination
+from .serializers import AssignmentSerializer, ClassSerializer, SubmissionSerializer, UserSerializer
+from .views import ClassView, SubmissionView
+
+
+def _wants_page(request):
+    params = request.GET
+    return OptionalCursorPagination.cursor_query_param in params or OptionalCursorPagination.page_size_query_param in params
+
+
+def async_reads(drf_view):
+    """Serve GET and HEAD with the decorated async view and everything else with `drf_view`."""
+    fallback = sync_to_async(drf_view)
+
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method in ('GET', 'HEAD') and not _wants_page(request):
+                return await view(request, *args, **kwargs)
+            return await fallback(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+async def _list(queryset):
+    return [obj async for obj in queryset]
+
+
+@async_reads(ClassView.as_view({'get': 'list', 'post': 'create'}, basename='class', detail=False))
+async def class_list(request):
+    # list classes for given teacher or student: /api/classes?teacher=<id> or /api/classes?student=<id>
+    teacher = request.GET.get('teacher', None)
+    student = request.GET.get('student', None)
+    if teacher is not None:
+        queryset = Class.objects.filter(teacher__id=teacher)
+    elif student is not None:
+        queryset = Class.objects.filter(students__id=student)
+    else:
+        return HttpResponseNotFound("Class(es) not found")
+    classes = await _list(queryset.order_by('id'))
+    return JsonResponse(ClassSerializer(classes, many=True).data, safe=False)
+
+
+@async_reads(ClassView.as_view({'get': 'assignments'}, basename='class', detail=True))
+async def class_assignments(request, pk):
+    # list assignments for given class: /api/classes/<id>/assignments
+    etag, timestamp, response = check_conditions(request, await sync_to_async(class_assignments_version)(pk))
+    if response is None:
+        assignments = await _list(Assignment.objects.filter(course__id=pk).order_by('id'))
+        response = JsonResponse(AssignmentSerializer(assignments, many=True).data, safe=False)
+    return add_validators(response, etag, timestamp)
+
+
+@async_reads(ClassView.as_view({'get': 'roster', 'patch': 'roster'}, basename='class', detail=True))
+async def class_roster(request, pk):
+    # list students for given class: /api/classes/<id>/roster
+    if not await Class.objects.filter(id=pk).aexists():
+        return HttpResponseNotFound(f"Class {pk} not found")
+    students = await _list(User.objects.filter(student_class_set__id=pk).order_by('id'))
+    return JsonResponse(UserSerializer(students, many=True).data, safe=False)
+
+
+@async_reads(SubmissionView.as_view(
+    {'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy'},
+    basename='submit', detail=True,
+))
+async def submission_detail(request, pk):
+    # submission with its files and comments: /api/submit/<id>
+    version = await sync_to_async(submission_version)(pk)
+    if version is None:
+        return JsonResponse({'detail': 'No AssignmentSubmission matches the given query.'}, status=404)
+    etag, timestamp, response = check_conditions(request, version)
+    if response is None:
+        submission = await AssignmentSubmission.objects.with_details().filter(pk=pk).afirst()
+        if submission is None:
+            return JsonResponse({'detail': 'No AssignmentSubmission matches the given query.'}, status=404)
+        response = JsonResponse(SubmissionSerializer(submission).data)
+    return add_validators(response, etag, timestamp)
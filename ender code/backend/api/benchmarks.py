@@ -0,0 +1,135 @@
+"""Helpers for HTTP benchmarks run against a live server process.
+
+Used by the `bench_serving` management command. Clients are threads with
+one keep-alive connection each, so a run measures the server rather than
+connection setup.
+"""
+
+import http.client
+import socket
+import subprocess
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed):
+    """Summarize request latencies (seconds) as throughput and p50/p95/p99 in milliseconds."""
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies) + errors,
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': _ms(percentile(latencies, 0.50)),
+        'p95_ms': _ms(percentile(latencies, 0.95)),
+        'p99_ms': _ms(percentile(latencies, 0.99)),
+    }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+
+def run_load(base_url, paths, concurrency, total_requests):
+    """GET `paths` round-robin from `concurrency` client threads until `total_requests` are done.
+
+    Returns:
+        dict: overall summary (see `summarize`) with a per-path breakdown under 'paths'
+    """
+    parts = urlsplit(base_url)
+    counter = iter(range(total_requests))
+    lock = threading.Lock()
+    results = {path: ([], [0]) for path in paths}
+
+    def client():
+        connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+        while True:
+            with lock:
+                n = next(counter, None)
+            if n is None:
+                break
+            path = paths[n % len(paths)]
+            latencies, errors = results[path]
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status < 400
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+        connection.close()
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    summary = summarize([x for latencies, _ in results.values() for x in latencies],
+                        sum(errors[0] for _, errors in results.values()), elapsed)
+    summary['paths'] = {
+        path: summarize(latencies, errors[0], elapsed) for path, (latencies, errors) in results.items()
+    }
+    return summary
+
+
+def wait_for_port(host, port, timeout=30):
+    """Block until a server accepts connections on host:port."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f'Nothing listening on {host}:{port} after {timeout}s')
+
+
+class ServerProcess:
+    """Context manager that starts a server command and stops it on exit."""
+
+    def __init__(self, command, host, port, cwd=None):
+        self.command = command
+        self.host = host
+        self.port = port
+        self.cwd = cwd
+        self.process = None
+
+    def __enter__(self):
+        self.process = subprocess.Popen(
+            self.command, cwd=self.cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            wait_for_port(self.host, self.port)
+        except TimeoutError:
+            self.__exit__(None, None, None)
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
@@ -0,0 +1,161 @@
+"""Content-addressed on-disk storage for submission file bodies.
+
+Blobs are keyed by the SHA-256 of their contents and stored under
+`settings.SUBMISSION_BLOB_ROOT`, so identical files are only written once.
+"""
+
+import hashlib
+import os
+import tempfile
+from array import array
+from pathlib import Path
+
+from django.conf import settings
+
+
+def blob_root():
+    """Get the directory blobs are stored under."""
+    return Path(settings.SUBMISSION_BLOB_ROOT)
+
+
+def blob_path(content_hash):
+    """Get the path of the blob with the given SHA-256 hex digest.
+
+    Blobs are fanned out over subdirectories named after the first two
+    characters of the hash to keep directory sizes small.
+    """
+    return blob_root() / content_hash[:2] / content_hash
+
+
+def line_index_path(content_hash):
+    """Get the path of the line-offset index stored next to a blob."""
+    return blob_root() / content_hash[:2] / f'{content_hash}.lines'
+
+
+def _write_atomic(path, data):
+    """Write bytes to a path via a temporary file so readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def put_blob(data):
+    """Store bytes in the blob store if they aren't already there.
+
+    Args:
+        data: bytes to store
+
+    Returns:
+        tuple: (SHA-256 hex digest, size in bytes)
+    """
+    content_hash = hashlib.sha256(data).hexdigest()
+    path = blob_path(content_hash)
+    if not path.exists():
+        _write_atomic(path, data)
+    return content_hash, len(data)
+
+
+def put_text(text):
+    """Store a string in the blob store as UTF-8."""
+    return put_blob(text.encode('utf-8'))
+
+
+def open_blob(content_hash):
+    """Open a stored blob for binary reading."""
+    return open(blob_path(content_hash), 'rb')
+
+
+def read_blob(content_hash):
+    """Read a stored blob into memory."""
+    with open_blob(content_hash) as f:
+        return f.read()
+
+
+def read_text(content_hash):
+    """Read a stored blob as a UTF-8 string."""
+    return read_blob(content_hash).decode('utf-8')
+
+
+#
+# Line-offset index
+#
+# The index is a packed array of unsigned 64-bit byte offsets: the start of
+# every line followed by the blob size, so line N (1-based) spans
+# offsets[N - 1]:offsets[N]. Reading a line range only touches two index
+# entries and the bytes of the lines themselves.
+#
+
+_OFFSET_SIZE = array('Q').itemsize
+
+
+def build_line_index(data):
+    """Compute the line-offset index for a blob's bytes."""
+    offsets = array('Q', [0])
+    pos = data.find(b'\n')
+    while pos != -1:
+        offsets.append(pos + 1)
+        pos = data.find(b'\n', pos + 1)
+    if offsets[-1] != len(data):
+        offsets.append(len(data))
+    return offsets
+
+
+def put_line_index(content_hash, data):
+    """Store the line-offset index for a blob if it isn't already there.
+
+    Args:
+        content_hash: SHA-256 hex digest of `data`
+        data: the blob's bytes
+
+    Returns:
+        int: number of lines in the blob
+    """
+    offsets = build_line_index(data)
+    path = line_index_path(content_hash)
+    if not path.exists():
+        _write_atomic(path, offsets.tobytes())
+    return len(offsets) - 1
+
+
+def read_lines(content_hash, start, end):
+    """Read lines `start` through `end` (1-based, inclusive) of a blob.
+
+    The range is clamped to the lines that exist. The index is rebuilt from
+    the blob if it is missing.
+
+    Returns:
+        list: the lines as strings, without line terminators
+    """
+    path = line_index_path(content_hash)
+    if not path.exists():
+        put_line_index(content_hash, read_blob(content_hash))
+
+    line_count = path.stat().st_size // _OFFSET_SIZE - 1
+    start = max(start, 1)
+    end = min(end, line_count)
+    if start > end:
+        return []
+
+    with open(path, 'rb') as index:
+        index.seek((start - 1) * _OFFSET_SIZE)
+        first = array('Q')
+        first.frombytes(index.read(_OFFSET_SIZE))
+        index.seek(end * _OFFSET_SIZE)
+        last = array('Q')
+        last.frombytes(index.read(_OFFSET_SIZE))
+
+    with open_blob(content_hash) as blob:
+        blob.seek(first[0])
+        chunk = blob.read(last[0] - first[0])
+
+    lines = chunk.decode('utf-8').split('\n')
+    if chunk.endswith(b'\n'):
+        lines.pop()
+    return [line.rstrip('\r') for line in lines]
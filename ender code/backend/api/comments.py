@@ -0,0 +1,129 @@
+"""Server-side assembly of threaded submission comments."""
+
+from django.db.models import Count
+
+from .models import AssignmentSubmissionComment
+
+
+def comment_node(comment):
+    """Convert a comment (with `user` loaded) into a tree node without replies."""
+    return {
+        'id': comment.id,
+        'submission': comment.submission_id,
+        'submission_file': comment.submission_file_id,
+        'comment_type': comment.comment_type,
+        'user': comment.user_id,
+        'user_name': comment.user.name,
+        'comment': comment.comment,
+        'start_line': comment.start_line,
+        'end_line': comment.end_line,
+        'start_offset': comment.start_offset,
+        'end_offset': comment.end_offset,
+        'parent': comment.parent_id,
+    }
+
+
+def build_comment_tree(comments, replies_limit=None):
+    """Nest comments under their parents in a single pass.
+
+    Comments whose parent is not among `comments` are treated as top-level
+    threads so nothing is dropped.
+
+    Args:
+        comments: Iterable of comments ordered by ID, with `user` loaded
+        replies_limit: Maximum number of replies to include per comment
+            (None for all). `reply_count` always holds the full number.
+
+    Returns:
+        list: Top-level comment nodes, each with nested `replies`
+    """
+    nodes = {}
+    ordered = []
+    for comment in comments:
+        node = comment_node(comment)
+        node['replies'] = []
+        node['reply_count'] = 0
+        nodes[comment.id] = node
+        ordered.append(node)
+
+    threads = []
+    for node in ordered:
+        parent = nodes.get(node['parent'])
+        if parent is None:
+            threads.append(node)
+            continue
+        parent['reply_count'] += 1
+        if replies_limit is None or len(parent['replies']) < replies_limit:
+            parent['replies'].append(node)
+    return threads
+
+
+def get_comment_tree(submission_id, submission_file_id=None, replies_limit=None):
+    """Load a submission's comments in one query and return them as threads.
+
+    Args:
+        submission_id: AssignmentSubmission ID
+        submission_file_id: only include comments on this file (optional)
+        replies_limit: see `build_comment_tree`
+    """
+    queryset = AssignmentSubmissionComment.objects.filter(submission_id=submission_id)
+    if submission_file_id is not None:
+        queryset = queryset.filter(submission_file_id=submission_file_id)
+    queryset = queryset.select_related('user').order_by('id')
+    return build_comment_tree(queryset, replies_limit)
+
+
+def get_reply_page(submission_id, parent_id, offset=0, limit=None):
+    """Get one page of direct replies to a comment, for threads trimmed by `replies_limit`.
+
+    Returns:
+        list: Reply nodes, each with `reply_count` but without nested replies
+    """
+    queryset = (
+        AssignmentSubmissionComment.objects.filter(submission_id=submission_id, parent_id=parent_id)
+        .select_related('user').annotate(reply_total=Count('replies')).order_by('id')
+    )
+    end = None if limit is None else offset + limit
+    replies = []
+    for comment in queryset[offset:end]:
+        node = comment_node(comment)
+        node['reply_count'] = comment.reply_total
+        replies.append(node)
+    return replies
+
+
+def get_comments_in_window(submission_file_id, start_line, end_line):
+    """Get the threads anchored on a file whose line range overlaps a window.
+
+    Top-level comments are matched with an interval-overlap query on the
+    (submission_file, start_line, end_line) index; their replies are then
+    loaded one nesting level per query, since replies are not anchored.
+
+    Args:
+        submission_file_id: AssignmentSubmissionFile ID
+        start_line: first visible line (inclusive)
+        end_line: last visible line (inclusive)
+
+    Returns:
+        list: Top-level comment nodes with nested `replies`
+    """
+    comments = list(
+        AssignmentSubmissionComment.objects.filter(
+            submission_file_id=submission_file_id,
+            parent__isnull=True,
+            start_line__lte=end_line,
+            end_line__gte=start_line,
+        ).select_related('user').order_by('id')
+    )
+
+    parent_ids = [c.id for c in comments]
+    while parent_ids:
+        replies = list(
+            AssignmentSubmissionComment.objects.filter(parent_id__in=parent_ids)
+            .select_related('user').order_by('id')
+        )
+        comments.extend(replies)
+        parent_ids = [c.id for c in replies]
+
+    comments.sort(key=lambda c: c.id)
+    return build_comment_tree(comments)
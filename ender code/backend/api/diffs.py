@@ -0,0 +1,288 @@
+"""Line diffs between submission versions, and moving comments onto a newer version.
+
+Files of two versions are matched by name. The line diff of a file is
+computed once per (old content hash, new content hash) pair and cached as
+a `FileDiff`, so every reviewer, and every later diff involving the same
+file contents, reuses it. Unchanged files (same hash) are never diffed.
+
+The cached difflib opcodes also say where each old line ended up, which is
+how comment anchors (start_line/end_line) are carried over to a new version.
+"""
+
+import difflib
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .blobstore import read_text
+from .events import record_moved_comments
+from .models import AssignmentSubmission, AssignmentSubmissionComment, FileDiff
+
+DEFAULT_CONTEXT = 3
+
+
+def split_lines(text):
+    """Split a file body into lines the way blobstore.read_lines numbers them."""
+    lines = text.split('\n')
+    if text.endswith('\n'):
+        lines.pop()
+    return [line.rstrip('\r') for line in lines]
+
+
+def previous_version(submission):
+    """The student's submission for the same assignment made just before this one, or None."""
+    earlier = Q(submitted_at__lt=submission.submitted_at) | Q(submitted_at=submission.submitted_at, id__lt=submission.id)
+    return (
+        AssignmentSubmission.objects
+        .filter(earlier, assignment_id=submission.assignment_id, user_id=submission.user_id)
+        .order_by('-submitted_at', '-id')
+        .first()
+    )
+
+
+def get_opcodes(pairs, texts=None):
+    """Get the line diff opcodes of (old hash, new hash) pairs, computing only those not cached.
+
+    Args:
+        pairs: Iterable of (old content hash, new content hash)
+        texts: optional dict of content hash -> lines, filled with any blobs read
+
+    Returns:
+        dict: (old hash, new hash) -> list of [tag, i1, i2, j1, j2]
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return {}
+    texts = {} if texts is None else texts
+    cached = {
+        (d.old_hash, d.new_hash): d.opcodes
+        for d in FileDiff.objects.filter(old_hash__in={old for old, _ in pairs}, new_hash__in={new for _, new in pairs})
+        if (d.old_hash, d.new_hash) in pairs
+    }
+    fresh = []
+    for old_hash, new_hash in pairs - set(cached):
+        for content_hash in (old_hash, new_hash):
+            if content_hash not in texts:
+                texts[content_hash] = split_lines(read_text(content_hash))
+        matcher = difflib.SequenceMatcher(None, texts[old_hash], texts[new_hash])
+        opcodes = [list(op) for op in matcher.get_opcodes()]
+        cached[(old_hash, new_hash)] = opcodes
+        fresh.append(FileDiff(old_hash=old_hash, new_hash=new_hash, opcodes=opcodes))
+    FileDiff.objects.bulk_create(fresh, ignore_conflicts=True)
+    return cached
+
+
+def build_hunks(opcodes, old_lines, new_lines, context=DEFAULT_CONTEXT):
+    """Group changes with `context` unchanged lines around them, like a unified diff.
+
+    Returns:
+        list: hunks with 1-based `old_start`/`new_start`, their line counts, and
+        `lines` of {'type': ' ' | '-' | '+', 'old': line number, 'new': line number, 'text'}
+    """
+    ranges = []
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'equal':
+            continue
+        lo = (max(i1 - context, 0), max(j1 - context, 0))
+        hi = (min(i2 + context, len(old_lines)), min(j2 + context, len(new_lines)))
+        # Unchanged stretches are the same length on both sides, so merging on old lines is enough
+        if ranges and lo[0] <= ranges[-1][1][0]:
+            ranges[-1][1] = hi
+        else:
+            ranges.append([lo, hi])
+
+    hunks = []
+    for (old_lo, new_lo), (old_hi, new_hi) in ranges:
+        lines = []
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == 'equal':
+                for i in range(max(i1, old_lo), min(i2, old_hi)):
+                    j = j1 + i - i1
+                    lines.append({'type': ' ', 'old': i + 1, 'new': j + 1, 'text': old_lines[i]})
+                continue
+            if not (old_lo <= i1 and i2 <= old_hi and new_lo <= j1 and j2 <= new_hi):
+                continue
+            lines.extend({'type': '-', 'old': i + 1, 'new': None, 'text': old_lines[i]} for i in range(i1, i2))
+            lines.extend({'type': '+', 'old': None, 'new': j + 1, 'text': new_lines[j]} for j in range(j1, j2))
+        hunks.append({
+            'old_start': old_lo + 1, 'old_count': old_hi - old_lo,
+            'new_start': new_lo + 1, 'new_count': new_hi - new_lo,
+            'lines': lines,
+        })
+    return hunks
+
+
+def remap_range(opcodes, start_line, end_line):
+    """Map a 1-based, inclusive line range of the old file onto the new file.
+
+    Returns:
+        tuple: (new start line, new end line, status), where status is `exact`
+        if none of the lines changed, `changed` if some were edited (the range
+        then covers their replacement), or `deleted` with None lines if all of
+        them were removed
+    """
+    lo, hi = start_line - 1, end_line
+    new_lo = new_hi = None
+    changed = False
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == 'insert':
+            # Lines added strictly inside the range change it; at either edge they don't
+            if lo < i1 < hi:
+                changed = True
+                new_lo, new_hi = _widen(new_lo, new_hi, j1, j2)
+            continue
+        if i2 <= lo or i1 >= hi:
+            continue
+        if tag == 'equal':
+            a, b = max(i1, lo), min(i2, hi)
+            new_lo, new_hi = _widen(new_lo, new_hi, j1 + a - i1, j1 + b - i1)
+        else:
+            changed = True
+            if j2 > j1:
+                new_lo, new_hi = _widen(new_lo, new_hi, j1, j2)
+    if new_lo is None:
+        return None, None, 'deleted'
+    return new_lo + 1, new_hi, 'changed' if changed else 'exact'
+
+
+def _widen(lo, hi, a, b):
+    return (a if lo is None else min(lo, a)), (b if hi is None else max(hi, b))
+
+
+def _files_by_name(submission):
+    return {f.name: f for f in submission.files.all()}
+
+
+def _changed_pairs(old_files, new_files):
+    """(old hash, new hash) of every file name in both versions whose contents differ."""
+    return {
+        (old_files[name].content_hash, new_files[name].content_hash)
+        for name in old_files.keys() & new_files.keys()
+        if old_files[name].content_hash != new_files[name].content_hash
+    }
+
+
+def diff_submissions(old, new, context=DEFAULT_CONTEXT):
+    """Diff every file of two versions, and preview where `old`'s file comments would land in `new`.
+
+    Args:
+        old: AssignmentSubmission to diff from, with files prefetched
+        new: AssignmentSubmission to diff to, with files prefetched
+
+    Returns:
+        dict: `files` (status, added/removed line counts and hunks per file name) and `comments`
+    """
+    old_files, new_files = _files_by_name(old), _files_by_name(new)
+    texts = {}
+    opcodes = get_opcodes(_changed_pairs(old_files, new_files), texts)
+
+    files = []
+    for name in sorted(old_files.keys() | new_files.keys()):
+        old_file, new_file = old_files.get(name), new_files.get(name)
+        entry = {
+            'name': name,
+            'file': new_file.id if new_file else None,
+            'against_file': old_file.id if old_file else None,
+        }
+        if old_file is None:
+            entry.update(status='added', added=new_file.line_count, removed=0, hunks=None)
+        elif new_file is None:
+            entry.update(status='removed', added=0, removed=old_file.line_count, hunks=None)
+        elif old_file.content_hash == new_file.content_hash:
+            entry.update(status='unchanged', added=0, removed=0, hunks=[])
+        else:
+            ops = opcodes[(old_file.content_hash, new_file.content_hash)]
+            old_lines = texts.get(old_file.content_hash) or split_lines(read_text(old_file.content_hash))
+            new_lines = texts.get(new_file.content_hash) or split_lines(read_text(new_file.content_hash))
+            entry.update(
+                status='modified',
+                added=sum(j2 - j1 for tag, _, _, j1, j2 in ops if tag != 'equal'),
+                removed=sum(i2 - i1 for tag, i1, i2, _, _ in ops if tag != 'equal'),
+                hunks=build_hunks(ops, old_lines, new_lines, context),
+            )
+        files.append(entry)
+
+    comments = []
+    for comment, new_file, start, end, state in _remapped_comments(old, old_files, new_files, opcodes):
+        comments.append({
+            'id': comment.id,
+            'file': comment.submission_file_id,
+            'start_line': comment.start_line,
+            'end_line': comment.end_line,
+            'new_file': new_file.id if new_file else None,
+            'new_start_line': start,
+            'new_end_line': end,
+            'status': state,
+        })
+    return {'files': files, 'comments': comments}
+
+
+def _remapped_comments(old, old_files, new_files, opcodes):
+    """Yield (comment, new file, new start, new end, status) for the top-level file comments on `old`."""
+    files_by_id = {f.id: f for f in old_files.values()}
+    queryset = AssignmentSubmissionComment.objects.filter(
+        submission_id=old.id, comment_type='file', parent__isnull=True,
+    ).order_by('id')
+    for comment in queryset:
+        old_file = files_by_id.get(comment.submission_file_id)
+        new_file = new_files.get(old_file.name) if old_file else None
+        if new_file is None:
+            yield comment, None, None, None, 'deleted'
+        elif new_file.content_hash == old_file.content_hash:
+            yield comment, new_file, comment.start_line, comment.end_line, 'exact'
+        else:
+            ops = opcodes[(old_file.content_hash, new_file.content_hash)]
+            yield (comment, new_file, *remap_range(ops, comment.start_line, comment.end_line))
+
+
+def move_comments(old, new):
+    """Move `old`'s file comments, with their replies, onto the matching lines of `new`.
+
+    Comments whose lines (or file) no longer exist stay on `old`, and so do
+    their replies. Linter comments are left alone, since every version is
+    linted on its own.
+
+    Args:
+        old: AssignmentSubmission to move comments from, with files prefetched
+        new: a later AssignmentSubmission to move comments to, with files prefetched
+
+    Returns:
+        dict: IDs of the `moved` comments and of those `left` on the old version, replies included
+    """
+    old_files, new_files = _files_by_name(old), _files_by_name(new)
+    opcodes = get_opcodes(_changed_pairs(old_files, new_files))
+
+    with transaction.atomic():
+        moved, left, anchors = [], [], {}
+        for comment, new_file, start, end, state in _remapped_comments(old, old_files, new_files, opcodes):
+            if state == 'deleted':
+                left.append(comment.id)
+                continue
+            anchors[comment.id] = (new_file.id, start, end)
+        # Replies follow their thread's root, whether it moves or stays
+        left_roots = set(left)
+        replies = AssignmentSubmissionComment.objects.filter(submission_id=old.id, parent__isnull=False)
+        parents = dict(replies.values_list('id', 'parent_id'))
+        for reply_id in parents:
+            root = reply_id
+            while root in parents:
+                root = parents[root]
+            if root in anchors:
+                anchors[reply_id] = anchors[root]
+            elif root in left_roots:
+                left.append(reply_id)
+
+        comments = list(AssignmentSubmissionComment.objects.filter(id__in=anchors).select_related('user'))
+        now = timezone.now()
+        for comment in comments:
+            comment.submission_file_id, comment.start_line, comment.end_line = anchors[comment.id]
+            comment.submission_id = new.id
+            comment.updated_at = now
+            moved.append(comment.id)
+        AssignmentSubmissionComment.objects.bulk_update(
+            comments, ['submission', 'submission_file', 'start_line', 'end_line', 'updated_at'],
+        )
+        AssignmentSubmission.objects.filter(pk__in=[old.id, new.id]).touch()
+        record_moved_comments(comments, old.id)
+    return {'moved': sorted(moved), 'left': sorted(left)}
@@ -0,0 +1,141 @@
+"""Live comment updates for submissions, streamed as Server-Sent Events.
+
+Every comment create, update and delete appends a `CommentEvent` row (see
+signals.py), so the events table is the fan-out: every server process sees
+every change without a message broker. Streams poll it by primary key,
+which is also the SSE event ID, so a reconnecting EventSource that sends
+`Last-Event-ID` resumes exactly where it left off.
+
+Streams close after settings.COMMENT_STREAM_TIMEOUT seconds and browsers
+reconnect on their own. Served through ASGI, a stream is an async generator
+and holds no worker thread while it waits.
+"""
+
+import asyncio
+import json
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from .comments import comment_node
+from .models import CommentEvent
+
+# Events sent per poll; a larger backlog is drained over consecutive polls without sleeping
+BATCH_SIZE = 100
+
+
+def comment_payload(comment):
+    """Serialize a comment (with `user` loaded) for a create or update event."""
+    node = comment_node(comment)
+    node['updated_at'] = comment.updated_at.isoformat() if comment.updated_at else None
+    return node
+
+
+def record_comment_event(comment, action):
+    """Append an event for a comment change.
+
+    Old events are pruned every few hundred writes, so the table only holds
+    settings.COMMENT_EVENT_RETENTION seconds of history.
+    """
+    payload = {'id': comment.id, 'parent': comment.parent_id} if action == CommentEvent.DELETE else comment_payload(comment)
+    event = CommentEvent.objects.create(
+        submission_id=comment.submission_id, comment_id=comment.id, action=action, payload=payload,
+    )
+    if event.id % settings.COMMENT_EVENT_PRUNE_EVERY == 0:
+        prune_comment_events()
+    return event
+
+
+def record_created_comments(comments):
+    """Append create events for comments inserted with bulk_create."""
+    CommentEvent.objects.bulk_create([
+        CommentEvent(submission_id=c.submission_id, comment_id=c.id, action=CommentEvent.CREATE, payload=comment_payload(c))
+        for c in comments
+    ])
+
+
+def record_moved_comments(comments, from_submission_id):
+    """Append delete events on the old submission and create events on the new one for moved comments."""
+    CommentEvent.objects.bulk_create(
+        [
+            CommentEvent(submission_id=from_submission_id, comment_id=c.id, action=CommentEvent.DELETE,
+                         payload={'id': c.id, 'parent': c.parent_id})
+            for c in comments
+        ] + [
+            CommentEvent(submission_id=c.submission_id, comment_id=c.id, action=CommentEvent.CREATE,
+                         payload=comment_payload(c))
+            for c in comments
+        ]
+    )
+
+
+def prune_comment_events():
+    """Delete events older than settings.COMMENT_EVENT_RETENTION seconds."""
+    cutoff = timezone.now() - timedelta(seconds=settings.COMMENT_EVENT_RETENTION)
+    return CommentEvent.objects.filter(created_at__lt=cutoff).delete()[0]
+
+
+def latest_event_id():
+    """ID of the newest event, where a stream without `Last-Event-ID` starts."""
+    return CommentEvent.objects.aggregate(latest=Max('id'))['latest'] or 0
+
+
+def fetch_events(submission_id, after_id):
+    """Get the next batch of a submission's events after `after_id`."""
+    return list(
+        CommentEvent.objects.filter(submission_id=submission_id, id__gt=after_id).order_by('id')[:BATCH_SIZE]
+    )
+
+
+def format_event(event):
+    """Encode an event as an SSE message named after its action."""
+    data = json.dumps(event.payload, separators=(',', ':'))
+    return f'id: {event.id}\nevent: {event.action}\ndata: {data}\n\n'
+
+
+def _stream_start():
+    return f'retry: {settings.COMMENT_STREAM_RETRY}\n\n'
+
+
+async def stream_comment_events(submission_id, after_id):
+    """Async generator of SSE messages for a submission, for ASGI servers."""
+    yield _stream_start()
+    fetch = sync_to_async(fetch_events)
+    started = last_sent = time.monotonic()
+    while time.monotonic() - started < settings.COMMENT_STREAM_TIMEOUT:
+        events = await fetch(submission_id, after_id)
+        for event in events:
+            yield format_event(event)
+            after_id = event.id
+        if events:
+            last_sent = time.monotonic()
+            if len(events) == BATCH_SIZE:
+                continue
+        elif time.monotonic() - last_sent >= settings.COMMENT_STREAM_HEARTBEAT:
+            # A comment line keeps proxies from closing an idle connection
+            yield ': keepalive\n\n'
+            last_sent = time.monotonic()
+        await asyncio.sleep(settings.COMMENT_STREAM_POLL_INTERVAL)
+
+
+def iter_comment_events(submission_id, after_id):
+    """Blocking generator of SSE messages for a submission, for WSGI servers such as runserver."""
+    yield _stream_start()
+    started = last_sent = time.monotonic()
+    while time.monotonic() - started < settings.COMMENT_STREAM_TIMEOUT:
+        events = fetch_events(submission_id, after_id)
+        for event in events:
+            yield format_event(event)
+            after_id = event.id
+        if events:
+            last_sent = time.monotonic()
+            if len(events) == BATCH_SIZE:
+                continue
+        elif time.monotonic() - last_sent >= settings.COMMENT_STREAM_HEARTBEAT:
+            yield ': keepalive\n\n'
+            last_sent = time.monotonic()
+        time.sleep(settings.COMMENT_STREAM_POLL_INTERVAL)
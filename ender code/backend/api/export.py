@@ -0,0 +1,149 @@
+"""Streaming zip export of an assignment's current submissions.
+
+File bodies are read from the blob store and deflated by a small thread
+pool (zlib releases the GIL), while the response generator writes finished
+entries out in order. Only a bounded window of files is in flight at once,
+so memory use does not grow with the size of the class.
+
+Under ASGI the response is served by `stream_assignment_zip`, which pulls
+the same generator one chunk at a time; Django would otherwise collect a
+sync iterator into a list before sending any of it.
+"""
+
+import posixpath
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from .blobstore import read_blob
+from .models import AssignmentSubmissionFile
+
+# General purpose flag bit 11: file names are UTF-8
+_UTF8_FLAG = 0x800
+_DEFLATED = 8
+_VERSION = 20
+_ZIP32_LIMIT = 0xFFFFFFFF
+
+
+def _dos_datetime(dt):
+    """Pack a datetime into the (time, date) pair used by zip headers."""
+    year = max(dt.year, 1980)
+    date = ((year - 1980) << 9) | (dt.month << 5) | dt.day
+    time = (dt.hour << 11) | (dt.minute << 5) | (dt.second // 2)
+    return time, date
+
+
+def _compress(content_hash):
+    """Read and deflate one blob. Runs in a worker thread."""
+    data = read_blob(content_hash)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    compressed = compressor.compress(data) + compressor.flush()
+    return zlib.crc32(data), len(data), compressed
+
+
+class StreamingZipWriter:
+    """Builds a zip archive entry by entry for already-compressed data.
+
+    Because sizes and CRCs are known before an entry is written, every
+    local header is complete and no seeking or data descriptors are needed.
+    """
+
+    def __init__(self):
+        self.offset = 0
+        self.central_directory = []
+
+    def entry(self, name, crc, size, compressed, modified):
+        """Return the bytes of one local file header followed by its data."""
+        encoded_name = name.encode('utf-8')
+        if self.offset > _ZIP32_LIMIT or size > _ZIP32_LIMIT or len(compressed) > _ZIP32_LIMIT:
+            raise ValueError('Export is too large for a zip archive without ZIP64 support')
+        time, date = _dos_datetime(modified)
+        fields = (_VERSION, _UTF8_FLAG, _DEFLATED, time, date, crc, len(compressed), size, len(encoded_name))
+        header = struct.pack('<4s5HI2I2H', b'PK\x03\x04', *fields, 0) + encoded_name
+        self.central_directory.append(
+            struct.pack('<4s6HI2I5H2I', b'PK\x01\x02', _VERSION, *fields, 0, 0, 0, 0, 0, self.offset)
+            + encoded_name
+        )
+        self.offset += len(header) + len(compressed)
+        return header + compressed
+
+    def finish(self):
+        """Return the central directory and end-of-archive record."""
+        directory = b''.join(self.central_directory)
+        count = len(self.central_directory)
+        if count > 0xFFFF or self.offset > _ZIP32_LIMIT:
+            raise ValueError('Export is too large for a zip archive without ZIP64 support')
+        end = struct.pack('<4s4H2IH', b'PK\x05\x06', 0, 0, count, count, len(directory), self.offset, 0)
+        return directory + end
+
+
+def _archive_name(folder, file_name, seen):
+    """Build a unique `folder/file` path that cannot escape the archive root."""
+    file_name = posixpath.normpath(file_name.replace('\\', '/')).lstrip('/')
+    while file_name.startswith('../'):
+        file_name = file_name[3:]
+    path = f'{folder}/{file_name or "unnamed"}'
+    candidate, n = path, 1
+    while candidate in seen:
+        n += 1
+        root, ext = posixpath.splitext(path)
+        candidate = f'{root} ({n}){ext}'
+    seen.add(candidate)
+    return candidate
+
+
+def iter_assignment_zip(assignment_id, workers=None):
+    """Yield a zip of every current submission of an assignment, laid out as `student/filename`.
+
+    Args:
+        assignment_id: Assignment ID
+        workers: compression threads (defaults to settings.EXPORT_COMPRESSION_WORKERS)
+    """
+    workers = workers or settings.EXPORT_COMPRESSION_WORKERS
+    files = (
+        AssignmentSubmissionFile.objects
+        .filter(submission__assignment_id=assignment_id, submission__is_current=True)
+        .select_related('submission__user')
+        .order_by('submission__user__email', 'id')
+        .only('name', 'content_hash', 'submission__submitted_at', 'submission__user__email')
+        .iterator(chunk_size=200)
+    )
+
+    writer = StreamingZipWriter()
+    seen = set()
+    pending = deque()
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        for f in files:
+            folder = f.submission.user.email.split('@')[0]
+            name = _archive_name(folder, f.name, seen)
+            pending.append((name, f.submission.submitted_at, executor.submit(_compress, f.content_hash)))
+            # Keep only a small window of files in flight
+            if len(pending) >= workers * 2:
+                name, modified, future = pending.popleft()
+                yield writer.entry(name, *future.result(), modified)
+        while pending:
+            name, modified, future = pending.popleft()
+            yield writer.entry(name, *future.result(), modified)
+        yield writer.finish()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def stream_assignment_zip(assignment_id, workers=None):
+    """Async generator of the same zip as `iter_assignment_zip`, for ASGI servers.
+
+    Each chunk is built in the request's sync thread, so the database cursor
+    stays on one connection and every entry is sent as soon as it is ready.
+    """
+    chunks = iter_assignment_zip(assignment_id, workers)
+    next_chunk = sync_to_async(next)
+    try:
+        while (chunk := await next_chunk(chunks, None)) is not None:
+            yield chunk
+    finally:
+        await sync_to_async(chunks.close)()
@@ -0,0 +1,102 @@
+"""Set-based group formation for assignments.
+
+Groups are checked against the class roster loaded once into a dict, and
+created with one `bulk_create` for the groups and one for their members,
+so forming every group in a class runs a fixed number of queries.
+"""
+
+import random
+
+from django.db import transaction
+
+from .models import AssignmentGroup, Class
+
+STRATEGIES = ('random', 'balanced')
+
+
+def enrolled_students(course_id):
+    """Map the email of every student in a class to their user ID, in one query."""
+    Through = Class.students.through
+    return dict(Through.objects.filter(class_id=course_id).values_list('user__email', 'user_id'))
+
+
+def grouped_students(assignment_id):
+    """IDs of the students already in a group for this assignment."""
+    Through = AssignmentGroup.users.through
+    return set(Through.objects.filter(assignmentgroup__assignment_id=assignment_id).values_list('user_id', flat=True))
+
+
+def members_from_emails(groups, enrolled, already_grouped=()):
+    """Resolve explicit groups of emails against the roster.
+
+    Emails of students not in the class, and of students who are already in
+    a group (an existing one, or an earlier one in `groups`), are left out
+    and reported.
+
+    Args:
+        groups: list of lists of email addresses
+        enrolled: dict of email -> user ID (see `enrolled_students`)
+        already_grouped: user IDs that are in a group already (see `grouped_students`)
+
+    Returns:
+        tuple: (list of lists of user IDs, emails not enrolled, emails already grouped)
+    """
+    placed = set(already_grouped)
+    members, not_enrolled, duplicates = [], [], []
+    for emails in groups:
+        user_ids = []
+        for email in emails:
+            user_id = enrolled.get(email.strip()) if isinstance(email, str) else None
+            if user_id is None:
+                not_enrolled.append(email)
+            elif user_id in placed:
+                duplicates.append(email)
+            else:
+                placed.add(user_id)
+                user_ids.append(user_id)
+        members.append(user_ids)
+    return members, not_enrolled, duplicates
+
+
+def split_into_groups(user_ids, size, strategy='random', seed=None):
+    """Shuffle students and split them into groups.
+
+    `random` makes groups of exactly `size`, with the leftover students in
+    one smaller last group. `balanced` makes as many groups as `random` would
+    but spreads the students so group sizes differ by at most one.
+
+    Returns:
+        list: lists of user IDs
+    """
+    user_ids = list(user_ids)
+    random.Random(seed).shuffle(user_ids)
+    if strategy == 'balanced':
+        count = -(-len(user_ids) // size)
+        return [user_ids[i::count] for i in range(count)]
+    return [user_ids[i:i + size] for i in range(0, len(user_ids), size)]
+
+
+def create_groups(assignment_id, members, replace=False):
+    """Create one group per non-empty list of user IDs, with a single insert for all memberships.
+
+    Args:
+        assignment_id: the assignment the groups belong to
+        members: list of lists of user IDs
+        replace: delete the assignment's existing groups first
+
+    Returns:
+        list: the created AssignmentGroups
+    """
+    members = [user_ids for user_ids in members if user_ids]
+    with transaction.atomic():
+        if replace:
+            AssignmentGroup.objects.filter(assignment_id=assignment_id).delete()
+        groups = AssignmentGroup.objects.bulk_create(
+            [AssignmentGroup(assignment_id=assignment_id) for _ in members]
+        )
+        Through = AssignmentGroup.users.through
+        Through.objects.bulk_create([
+            Through(assignmentgroup_id=group.id, user_id=user_id)
+            for group, user_ids in zip(groups, members) for user_id in user_ids
+        ])
+    return groups
@@ -0,0 +1,163 @@
+"""Linter ingest stage that turns linter output into 'linter' comments.
+
+Linters run as subprocesses on the blob files themselves, in a process pool
+outside the request path (see the `lint_submissions` management command).
+Findings are cached per content hash and linter, so resubmitting an
+unchanged file never runs the linters again.
+"""
+
+import posixpath
+import re
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+
+from .blobstore import blob_path
+from .events import record_created_comments
+from .models import AssignmentSubmission, AssignmentSubmissionComment, AssignmentSubmissionFile, LintResult, User
+
+# path:line:column: message  or  path:line: message
+FINDING_LINE = re.compile(r'^(?P<path>.+?):(?P<line>\d+):(?:(?P<column>\d+):)?\s*(?P<message>.+)$')
+
+
+def linters_for(file_name):
+    """Get the configured {linter name: command} mapping for a file name."""
+    ext = posixpath.splitext(file_name)[1].lower()
+    return settings.SUBMISSION_LINTERS.get(ext, {})
+
+
+def parse_findings(output, path):
+    """Parse `path:line[:column]: message` lines reported for `path`."""
+    findings = []
+    for text in output.splitlines():
+        match = FINDING_LINE.match(text)
+        if match is None or match.group('path') != path:
+            continue
+        findings.append({
+            'line': int(match.group('line')),
+            'column': int(match.group('column') or 0),
+            'message': match.group('message').strip(),
+        })
+    return findings
+
+
+def run_linter(command, path, timeout):
+    """Run one linter on a file. Runs in a worker process.
+
+    Returns:
+        list: findings, or None if the linter could not be run
+    """
+    try:
+        result = subprocess.run(
+            [*command, path], capture_output=True, text=True, timeout=timeout,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    findings = parse_findings(result.stdout + '\n' + result.stderr, path)
+    if not findings and result.returncode != 0:
+        # Nonzero exit without any findings means the linter itself failed
+        return None
+    return findings
+
+
+def _lint_job(job):
+    content_hash, linter, command, path, timeout = job
+    return content_hash, linter, run_linter(command, path, timeout)
+
+
+def get_linter_user():
+    """Get the user that linter comments are attributed to."""
+    user, _ = User.objects.get_or_create(
+        email=settings.LINTER_USER_EMAIL, defaults={'name': 'Linter', 'is_teacher': False, 'is_system': True},
+    )
+    return user
+
+
+def lint_files(files, workers=None):
+    """Lint submission files and attach their findings as 'linter' comments.
+
+    Only (content hash, linter) pairs without a cached LintResult are run,
+    in a pool of `workers` processes. Comments are inserted with a single
+    bulk_create and the files are marked as linted.
+
+    Args:
+        files: Iterable of AssignmentSubmissionFile
+        workers: pool size (defaults to settings.LINT_WORKERS)
+
+    Returns:
+        int: number of linter comments created
+    """
+    files = list(files)
+    if not files:
+        return 0
+    workers = workers or settings.LINT_WORKERS
+
+    wanted = {(f.content_hash, linter): command for f in files for linter, command in linters_for(f.name).items()}
+    cached = {
+        (r.content_hash, r.linter): r.findings
+        for r in LintResult.objects.filter(content_hash__in={h for h, _ in wanted})
+        if (r.content_hash, r.linter) in wanted
+    }
+
+    jobs = [
+        (content_hash, linter, command, str(blob_path(content_hash)), settings.LINT_TIMEOUT)
+        for (content_hash, linter), command in wanted.items() if (content_hash, linter) not in cached
+    ]
+    failed = set()
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            fresh = []
+            for content_hash, linter, findings in pool.map(_lint_job, jobs):
+                if findings is None:
+                    failed.add((content_hash, linter))
+                    continue
+                cached[(content_hash, linter)] = findings
+                fresh.append(LintResult(content_hash=content_hash, linter=linter, findings=findings))
+        LintResult.objects.bulk_create(fresh, ignore_conflicts=True)
+
+    linter_user = get_linter_user()
+    comments = []
+    done = []
+    for f in files:
+        linters = linters_for(f.name)
+        if any((f.content_hash, linter) in failed for linter in linters):
+            # Leave the file unlinted so a later run retries it
+            continue
+        for linter in linters:
+            for finding in cached[(f.content_hash, linter)]:
+                offset = max(finding['column'] - 1, 0)
+                comments.append(AssignmentSubmissionComment(
+                    submission_id=f.submission_id,
+                    submission_file=f,
+                    comment_type='linter',
+                    user=linter_user,
+                    start_line=finding['line'],
+                    end_line=finding['line'],
+                    start_offset=offset,
+                    end_offset=offset,
+                    comment=f"{linter}: {finding['message']}",
+                ))
+        done.append(f.id)
+
+    with transaction.atomic():
+        AssignmentSubmissionComment.objects.bulk_create(comments)
+        AssignmentSubmissionFile.objects.filter(id__in=done).update(linted=True)
+        if comments:
+            AssignmentSubmission.objects.filter(id__in={c.submission_id for c in comments}).touch()
+            record_created_comments(comments)
+    return len(comments)
+
+
+def lint_pending(limit=None, workers=None):
+    """Lint every submission file that hasn't been linted yet.
+
+    Returns:
+        tuple: (number of files processed, number of comments created)
+    """
+    queryset = AssignmentSubmissionFile.objects.filter(linted=False).order_by('id')
+    if limit is not None:
+        queryset = queryset[:limit]
+    files = list(queryset)
+    return len(files), lint_files(files, workers)
@@ -0,0 +1,286 @@
+"""Deadline-night load test for the API (see `manage.py loadtest`).
+
+Simulated students and teachers drive the real WSGI application over HTTP.
+Students first upload a new submission all at once (the burst), then review
+their group mates' code: they open submissions, read file lines, and post
+and read comments. At the same time, teachers page through the roster,
+submission listings and status views.
+
+The server runs in-process on a fresh, seeded SQLite database in a temporary
+directory, so the development database is never touched. Each response
+carries the number of SQL queries its request ran, so results show
+latency, throughput and query counts per endpoint.
+"""
+
+import http.client
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import connection
+from django.utils import timezone
+
+from .benchmarks import summarize
+from .models import Assignment, AssignmentGroup, AssignmentSubmission, AssignmentSubmissionFile, Class, User
+
+QUERY_COUNT_HEADER = 'X-Query-Count'
+
+
+def seed_fixtures(students, group_size, files_per_submission, lines_per_file):
+    """Create a class with one teacher, groups of students and a first submission for each.
+
+    Returns:
+        dict: IDs used by the simulated clients
+    """
+    now = timezone.now()
+    teacher = User.objects.create(name='Load Teacher', email='load-teacher@union.edu', is_teacher=True)
+    course = Class.objects.create(
+        code='LOAD-100', name='Load Test', term='F', year=now.year,
+        start_date=now.date(), end_date=(now + timedelta(days=90)).date(), teacher=teacher,
+    )
+    User.objects.bulk_create([
+        User(name=f'Load Student {i}', email=f'load-student{i}@union.edu') for i in range(students)
+    ])
+    student_list = list(User.objects.filter(is_teacher=False, email__startswith='load-student').order_by('id'))
+    course.students.set(student_list)
+    assignment = Assignment.objects.create(
+        course=course, name='Deadline Project', description='',
+        release_date=now - timedelta(days=7),
+        submission_deadline=now + timedelta(hours=1),
+        commenting_deadline=now + timedelta(days=7),
+    )
+    for i in range(0, students, group_size):
+        group = AssignmentGroup.objects.create(assignment=assignment)
+        group.users.set(student_list[i:i + group_size])
+
+    AssignmentSubmission.objects.bulk_create([
+        AssignmentSubmission(assignment=assignment, user=s, is_current=True) for s in student_list
+    ])
+    files = []
+    for submission in AssignmentSubmission.objects.filter(assignment=assignment):
+        for n in range(files_per_submission):
+            f = AssignmentSubmissionFile(submission=submission, name=f'module{n}.py')
+            f.set_content(source_file(submission.user_id, n, lines_per_file))
+            files.append(f)
+    AssignmentSubmissionFile.objects.bulk_create(files)
+
+    return {
+        'teacher': teacher.id,
+        'class': course.id,
+        'assignment': assignment.id,
+        'students': [s.id for s in student_list],
+    }
+
+
+def source_file(user_id, n, lines):
+    """Fake Python source that differs per student and file."""
+    return ''.join(f'value_{user_id}_{n}_{line} = {line} * {user_id}\n' for line in range(lines))
+
+
+def count_queries(app):
+    """Wrap a WSGI application so each response reports how many SQL queries it ran."""
+    def counting_app(environ, start_response):
+        count = 0
+
+        def counter(execute, sql, params, many, context):
+            nonlocal count
+            # PRAGMAs run once per new connection (see api/sqlite.py), not per request
+            if not sql.startswith('PRAGMA'):
+                count += 1
+            return execute(sql, params, many, context)
+
+        def counting_start_response(status, headers, exc_info=None):
+            return start_response(status, headers + [(QUERY_COUNT_HEADER, str(count))], exc_info)
+
+        # The view has run, and its queries have been counted, before start_response is called
+        with connection.execute_wrapper(counter):
+            return app(environ, counting_start_response)
+    return counting_app
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class _LoadTestServer(ThreadedWSGIServer):
+    # Every simulated client connects at once during the upload burst
+    request_queue_size = 1024
+
+
+@contextmanager
+def serve():
+    """Run the WSGI application on a free local port for the duration of the block."""
+    server = _LoadTestServer(('127.0.0.1', 0), _QuietRequestHandler)
+    server.set_app(count_queries(get_wsgi_application()))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'127.0.0.1:{server.server_address[1]}'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class Recorder:
+    """Collects (latency, HTTP status, SQL count) samples per endpoint from many client threads.
+
+    Status 0 means the request failed without a response.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}
+
+    def add(self, endpoint, latency, status, queries):
+        with self.lock:
+            self.samples.setdefault(endpoint, []).append((latency, status, queries))
+
+    def report(self, elapsed):
+        endpoints = {}
+        everything = []
+        for endpoint, samples in sorted(self.samples.items()):
+            endpoints[endpoint] = _endpoint_summary(samples, elapsed)
+            everything.extend(samples)
+        return {'overall': _endpoint_summary(everything, elapsed), 'endpoints': endpoints}
+
+
+def _ok(status):
+    return 0 < status < 400
+
+
+def _endpoint_summary(samples, elapsed):
+    failed = [status for _, status, _ in samples if not _ok(status)]
+    summary = summarize([latency for latency, status, _ in samples if _ok(status)], len(failed), elapsed)
+    summary['error_statuses'] = {str(status): failed.count(status) for status in sorted(set(failed))}
+    queries = [q for _, _, q in samples if q is not None]
+    summary['sql_mean'] = round(sum(queries) / len(queries), 1) if queries else None
+    summary['sql_max'] = max(queries) if queries else None
+    return summary
+
+
+class SimulatedClient:
+    """One user's keep-alive HTTP connection that records every request."""
+
+    def __init__(self, address, recorder):
+        self.address = address
+        self.recorder = recorder
+        self.connection = http.client.HTTPConnection(address, timeout=120)
+
+    def request(self, endpoint, method, path, data=None):
+        body = None if data is None else json.dumps(data)
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        started = time.perf_counter()
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            content = response.read()
+            queries = response.getheader(QUERY_COUNT_HEADER)
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = http.client.HTTPConnection(self.address, timeout=120)
+            content, queries, status = b'', None, 0
+        self.recorder.add(endpoint, time.perf_counter() - started, status, None if queries is None else int(queries))
+        return json.loads(content) if _ok(status) and content else None
+
+    def close(self):
+        self.connection.close()
+
+
+def student_session(client, fixtures, student_id, rounds, burst, completed, options, rng):
+    """Browse, upload in the burst, then review group mates' submissions for `rounds` rounds."""
+    assignment_id = fixtures['assignment']
+    client.request('classes_for_student', 'GET', f'/api/classes/?student={student_id}')
+    client.request('class_assignments', 'GET', f"/api/classes/{fixtures['class']}/assignments/")
+    groups = client.request('student_group', 'GET', f'/api/assignments/{assignment_id}/groups/?student={student_id}')
+    mates = [u['id'] for g in groups or [] for u in g['users'] if u['id'] != student_id] or [student_id]
+
+    files = [
+        {'name': f'module{n}.py', 'content': source_file(student_id, n + rng.randrange(1000), options['lines_per_file'])}
+        for n in range(options['files_per_submission'])
+    ]
+    burst.wait()
+    client.request('submission_upload', 'POST', '/api/submit/upload/',
+                   {'assignment': assignment_id, 'user': student_id, 'files': files})
+
+    for _ in range(rounds):
+        peer = rng.choice(mates)
+        current = client.request(
+            'current_submission', 'GET',
+            f'/api/assignments/{assignment_id}/submissions/?student={peer}&current=true&requester={student_id}',
+        )
+        if not current:
+            continue
+        submission = current[0]
+        client.request('submission_detail', 'GET', f"/api/submit/{submission['id']}/")
+        if not submission['files']:
+            continue
+        file_id = rng.choice(submission['files'])['id']
+        start = rng.randrange(1, options['lines_per_file'] - 40)
+        client.request('file_lines', 'GET', f'/api/addfile/{file_id}/lines/?start={start}&end={start + 40}')
+        client.request('file_comment_window', 'GET', f'/api/addfile/{file_id}/comments/?start={start}&end={start + 40}')
+        client.request('comment_post', 'POST', '/api/addcomment/', {
+            'submission': submission['id'], 'submission_file': file_id, 'user': student_id,
+            'comment': 'Could this be simpler?', 'start_line': start, 'end_line': start + 2,
+            'start_offset': 0, 'end_offset': 10, 'parent': None,
+        })
+        client.request('comment_tree', 'GET', f"/api/submit/{submission['id']}/comments/tree/?file={file_id}")
+    completed.append(student_id)
+
+
+def teacher_session(client, fixtures, rounds, burst):
+    """Check on the class while the students work: roster, listings, status and stats."""
+    assignment_id = fixtures['assignment']
+    burst.wait()
+    for _ in range(rounds):
+        client.request('classes_for_teacher', 'GET', f"/api/classes/?teacher={fixtures['teacher']}")
+        client.request('class_roster', 'GET', f"/api/classes/{fixtures['class']}/roster/")
+        client.request('assignment_submissions', 'GET', f'/api/assignments/{assignment_id}/submissions/')
+        client.request('assignment_status', 'GET', f'/api/assignments/{assignment_id}/status/')
+        client.request('assignment_deadlines', 'GET', f'/api/assignments/{assignment_id}/deadlines/')
+        client.request('assignment_stats', 'GET', f'/api/assignments/{assignment_id}/stats/')
+
+
+def run_loadtest(fixtures, students, teachers, rounds, teacher_rounds, options, seed=0):
+    """Run every simulated user in its own thread against an in-process server.
+
+    Returns:
+        dict: results per endpoint and overall (see `Recorder.report`)
+    """
+    recorder = Recorder()
+    student_ids = fixtures['students'][:students]
+    # Students upload together once everyone (teachers included) is connected
+    burst = threading.Barrier(len(student_ids) + teachers, timeout=300)
+    completed = []
+    with serve() as address:
+        clients = []
+        threads = []
+        for i, student_id in enumerate(student_ids):
+            client = SimulatedClient(address, recorder)
+            clients.append(client)
+            threads.append(threading.Thread(target=student_session, args=(
+                client, fixtures, student_id, rounds, burst, completed, options, random.Random(seed + i),
+            )))
+        for _ in range(teachers):
+            client = SimulatedClient(address, recorder)
+            clients.append(client)
+            threads.append(threading.Thread(target=teacher_session, args=(client, fixtures, teacher_rounds, burst)))
+
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        for client in clients:
+            client.close()
+
+    report = recorder.report(elapsed)
+    report['completed_students'] = len(completed)
+    return report
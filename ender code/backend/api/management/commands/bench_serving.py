@@ -0,0 +1,75 @@
+import importlib.util
+import json
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarks import ServerProcess, run_load
+from api.models import AssignmentSubmission, Class
+
+
+class Command(BaseCommand):
+    help = ("Compare the WSGI server (runserver) with the ASGI server (uvicorn + async read views) "
+            "under concurrent load on the hot read endpoints, using the current database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=50, help='Concurrent clients.')
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per server.')
+        parser.add_argument('--asgi-workers', type=int, default=1, help='uvicorn worker processes.')
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765, help='Port for the server under test.')
+        parser.add_argument('--only', choices=['wsgi', 'asgi'], default=None, help='Benchmark one server only.')
+        parser.add_argument('--json', metavar='PATH', default=None, help='Also write the results to a JSON file.')
+
+    def hot_paths(self):
+        course = Class.objects.filter(students__isnull=False).order_by('id').first()
+        submission = AssignmentSubmission.objects.filter(is_current=True).order_by('id').first()
+        if course is None or submission is None:
+            raise CommandError("Need at least one class with students and one submission to benchmark.")
+        student = course.students.order_by('id').first()
+        return [
+            f'/api/classes/?teacher={course.teacher_id}',
+            f'/api/classes/?student={student.id}',
+            f'/api/classes/{course.id}/assignments/',
+            f'/api/classes/{course.id}/roster/',
+            f'/api/submit/{submission.id}/',
+        ]
+
+    def server_commands(self, host, port, asgi_workers):
+        return {
+            'wsgi': [sys.executable, 'manage.py', 'runserver', '--noreload', f'{host}:{port}'],
+            'asgi': [
+                sys.executable, '-m', 'uvicorn', 'backend.asgi:application', '--host', host, '--port', str(port),
+                '--workers', str(asgi_workers), '--no-access-log', '--log-level', 'warning',
+            ],
+        }
+
+    def handle(self, *args, **options):
+        host, port = options['host'], options['port']
+        servers = self.server_commands(host, port, options['asgi_workers'])
+        if options['only']:
+            servers = {options['only']: servers[options['only']]}
+        if 'asgi' in servers and importlib.util.find_spec('uvicorn') is None:
+            raise CommandError("uvicorn is not installed (pip install uvicorn), or pass --only wsgi.")
+
+        paths = self.hot_paths()
+        results = {}
+        for name, command in servers.items():
+            self.stdout.write(f"Benchmarking {name}: {' '.join(command)}")
+            with ServerProcess(command, host, port, cwd=settings.BASE_DIR):
+                base_url = f'http://{host}:{port}'
+                # Warm up connections, caches and lazily imported code before measuring
+                run_load(base_url, paths, min(options['concurrency'], 10), len(paths) * 10)
+                results[name] = run_load(base_url, paths, options['concurrency'], options['requests'])
+            summary = results[name]
+            self.stdout.write(
+                f"  {summary['requests_per_second']} req/s, p50 {summary['p50_ms']} ms, "
+                f"p95 {summary['p95_ms']} ms, p99 {summary['p99_ms']} ms, {summary['errors']} error(s)"
+            )
+            for path, stats in summary['paths'].items():
+                self.stdout.write(f"    {path}: p50 {stats['p50_ms']} ms, p99 {stats['p99_ms']} ms")
+
+        if options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump({'concurrency': options['concurrency'], 'results': results}, f, indent=2)
@@ -0,0 +1,146 @@
+import json
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from api.models import AssignmentSubmission, AssignmentSubmissionComment, AssignmentSubmissionFile, User
+
+# The two database setups being compared. "default" is what backend/settings.py gets:
+# rollback journal, a new connection per request and deferred transactions.
+# "production" is backend/settings_production.py as served by a WSGI server (the
+# benchmark's threads stand in for its worker threads). `database` is merged into
+# the DATABASES entry and `pragmas` becomes SQLITE_PRAGMAS, which api/sqlite.py
+# applies to every new connection.
+PROFILES = {
+    'default': {'journal_mode': 'DELETE', 'pragmas': {}, 'database': {'CONN_MAX_AGE': 0}},
+    'production': {
+        'journal_mode': 'WAL',
+        'pragmas': {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'mmap_size': 256 * 1024 * 1024,
+                    'cache_size': -64 * 1024, 'busy_timeout': 5000},
+        'database': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True,
+                     'OPTIONS': {'transaction_mode': 'IMMEDIATE'}},
+    },
+}
+
+
+class Workload:
+    """Submission-detail reads and comment-posting writes through one Django database alias."""
+
+    def __init__(self, alias, submission_ids, user_id):
+        self.alias = alias
+        self.submission_ids = submission_ids
+        self.user_id = user_id
+
+    def read(self):
+        submission_id = random.choice(self.submission_ids)
+        AssignmentSubmission.objects.using(self.alias).filter(id=submission_id).first()
+        list(AssignmentSubmissionFile.objects.using(self.alias).filter(submission_id=submission_id))
+        list(AssignmentSubmissionComment.objects.using(self.alias).filter(submission_id=submission_id))
+
+    def write(self):
+        submission_id = random.choice(self.submission_ids)
+        # bulk_create and update() send no signals, so nothing touches the live database
+        with transaction.atomic(using=self.alias):
+            AssignmentSubmissionComment.objects.using(self.alias).bulk_create([AssignmentSubmissionComment(
+                submission_id=submission_id, comment_type='general', start_line=1, end_line=1,
+                start_offset=0, end_offset=0, user_id=self.user_id, comment='benchmark',
+            )])
+            AssignmentSubmission.objects.using(self.alias).filter(id=submission_id).update(updated_at=timezone.now())
+
+    def run(self, readers, writers, seconds):
+        """Run reader and writer threads for `seconds` and count completed and failed operations."""
+        counts = {'reads': 0, 'writes': 0, 'read_errors': 0, 'write_errors': 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + seconds
+
+        def loop(operation, done_key, error_key):
+            # Django connections are per thread, like a WSGI worker's
+            connection = connections[self.alias]
+            done = errors = 0
+            try:
+                while time.monotonic() < deadline:
+                    try:
+                        operation()
+                        done += 1
+                    except OperationalError:
+                        errors += 1
+                    finally:
+                        # What Django does at the end of every request: close the
+                        # connection unless CONN_MAX_AGE says to keep it
+                        connection.close_if_unusable_or_obsolete()
+            finally:
+                connection.close()
+            with lock:
+                counts[done_key] += done
+                counts[error_key] += errors
+
+        threads = (
+            [threading.Thread(target=loop, args=(self.read, 'reads', 'read_errors')) for _ in range(readers)]
+            + [threading.Thread(target=loop, args=(self.write, 'writes', 'write_errors')) for _ in range(writers)]
+        )
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counts['reads_per_second'] = round(counts['reads'] / seconds, 1)
+        counts['writes_per_second'] = round(counts['writes'] / seconds, 1)
+        return counts
+
+
+class Command(BaseCommand):
+    help = ("Compare concurrent read/write throughput of the default SQLite setup with the "
+            "production profile (WAL, tuned PRAGMAs, persistent connections) on a copy of the database.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8, help='Reader threads.')
+        parser.add_argument('--writers', type=int, default=2, help='Writer threads.')
+        parser.add_argument('--seconds', type=float, default=10, help='Duration of each run.')
+        parser.add_argument('--json', metavar='PATH', default=None, help='Also write the results to a JSON file.')
+
+    def handle(self, *args, **options):
+        database = settings.DATABASES['default']
+        if database['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError("bench_sqlite only benchmarks SQLite databases.")
+        submission_ids = list(AssignmentSubmission.objects.values_list('id', flat=True)[:1000])
+        user_id = User.objects.values_list('id', flat=True).first()
+        if not submission_ids or user_id is None:
+            raise CommandError("Need at least one user and one submission to benchmark.")
+
+        results = {}
+        with tempfile.TemporaryDirectory(prefix='bench-sqlite-') as tmp:
+            for name, profile in PROFILES.items():
+                # Each profile gets a fresh copy, so the live database is never written to
+                path = str(Path(tmp) / f'{name}.sqlite3')
+                shutil.copyfile(database['NAME'], path)
+                with sqlite3.connect(path) as connection:
+                    connection.execute(f"PRAGMA journal_mode = {profile['journal_mode']}")
+                alias = f'bench_{name}'
+                connections.settings[alias] = {
+                    **connections.settings['default'], **profile['database'], 'NAME': path,
+                }
+                try:
+                    with override_settings(SQLITE_PRAGMAS=profile['pragmas']):
+                        workload = Workload(alias, submission_ids, user_id)
+                        results[name] = workload.run(options['readers'], options['writers'], options['seconds'])
+                finally:
+                    del connections.settings[alias]
+                r = results[name]
+                self.stdout.write(
+                    f"{name}: {r['reads_per_second']} reads/s, {r['writes_per_second']} writes/s, "
+                    f"{r['read_errors']} read and {r['write_errors']} write error(s)"
+                )
+
+        if options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump({'readers': options['readers'], 'writers': options['writers'],
+                           'seconds': options['seconds'], 'results': results}, f, indent=2)
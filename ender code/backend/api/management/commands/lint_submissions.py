@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.linting import lint_pending
+
+
+class Command(BaseCommand):
+    help = "Run the configured linters on submission files that haven't been linted and add 'linter' comments."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=500, help='Most files to lint per batch.')
+        parser.add_argument('--workers', type=int, default=None, help='Linter processes (default: LINT_WORKERS).')
+        parser.add_argument('--watch', type=float, default=None, metavar='SECONDS',
+                            help='Keep running, checking for new files every SECONDS.')
+
+    def handle(self, *args, **options):
+        while True:
+            files, comments = lint_pending(limit=options['limit'], workers=options['workers'])
+            if files:
+                self.stdout.write(f"Linted {files} file(s), added {comments} comment(s)")
+            if options['watch'] is None:
+                if not files:
+                    self.stdout.write("Nothing to lint")
+                return
+            if files < options['limit']:
+                time.sleep(options['watch'])
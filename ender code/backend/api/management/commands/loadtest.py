@@ -0,0 +1,85 @@
+import json
+import tempfile
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from api.loadtest import run_loadtest, seed_fixtures
+
+
+class Command(BaseCommand):
+    help = ("Load-test the API with concurrent simulated students and teachers on a fresh seeded database "
+            "and report p50/p95/p99 latency, throughput and SQL queries per endpoint.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=120, help='Simulated students (all upload at once).')
+        parser.add_argument('--teachers', type=int, default=3, help='Simulated teachers.')
+        parser.add_argument('--group-size', type=int, default=3)
+        parser.add_argument('--rounds', type=int, default=5, help='Review rounds per student after uploading.')
+        parser.add_argument('--teacher-rounds', type=int, default=5, help='Dashboard refreshes per teacher.')
+        parser.add_argument('--files', type=int, default=3, help='Files per submission.')
+        parser.add_argument('--lines', type=int, default=200, help='Lines per file.')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the simulated users.')
+        parser.add_argument('--json', metavar='PATH', default=None, help='Write the results to a JSON file.')
+        parser.add_argument('--baseline', metavar='PATH', default=None,
+                            help='Compare p95 latency and SQL counts with an earlier --json result.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("loadtest creates a throwaway SQLite database and needs the SQLite backend.")
+        if options['lines'] < 50:
+            raise CommandError("--lines must be at least 50.")
+        fixture_options = {'files_per_submission': options['files'], 'lines_per_file': options['lines']}
+
+        with tempfile.TemporaryDirectory(prefix='loadtest-') as tmp:
+            connection.settings_dict['TEST']['NAME'] = str(Path(tmp) / 'loadtest.sqlite3')
+            old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                with override_settings(DEBUG=False, ALLOWED_HOSTS=['127.0.0.1', 'localhost'],
+                                       SUBMISSION_BLOB_ROOT=Path(tmp) / 'blobs'):
+                    fixtures = seed_fixtures(options['students'], options['group_size'], **fixture_options)
+                    self.stdout.write(
+                        f"Seeded {options['students']} students; running {options['students']} students "
+                        f"and {options['teachers']} teachers"
+                    )
+                    report = run_loadtest(
+                        fixtures, options['students'], options['teachers'], options['rounds'],
+                        options['teacher_rounds'], fixture_options, seed=options['seed'],
+                    )
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        report['parameters'] = {k: options[k] for k in
+                                ('students', 'teachers', 'group_size', 'rounds', 'teacher_rounds', 'files', 'lines', 'seed')}
+        report['finished_at'] = timezone.now().isoformat()
+        self.print_report(report, self.load_baseline(options['baseline']))
+        if options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump(report, f, indent=2)
+
+    def load_baseline(self, path):
+        if path is None:
+            return None
+        try:
+            with open(path) as f:
+                return json.load(f)['endpoints']
+        except (OSError, ValueError, KeyError) as e:
+            raise CommandError(f"Could not read baseline {path}: {e}")
+
+    def print_report(self, report, baseline):
+        self.stdout.write(f"{'endpoint':<24}{'reqs':>6}{'err':>5}{'req/s':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'sql':>6}")
+        rows = list(report['endpoints'].items()) + [('overall', report['overall'])]
+        for name, r in rows:
+            line = (f"{name:<24}{r['requests']:>6}{r['errors']:>5}{r['requests_per_second'] or 0:>8}"
+                    f"{r['p50_ms'] or 0:>9}{r['p95_ms'] or 0:>9}{r['p99_ms'] or 0:>9}{r['sql_mean'] or 0:>6}")
+            old = (baseline or {}).get(name)
+            if old and old.get('p95_ms') and r['p95_ms']:
+                change = (r['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100
+                line += f"  p95 {change:+.0f}%, sql {old['sql_mean']} -> {r['sql_mean']}"
+            self.stdout.write(line)
+            if r['error_statuses']:
+                self.stdout.write(f"{'':<24}errors by status: {r['error_statuses']}")
+        self.stdout.write("Latencies in ms; sql is the mean number of queries per request.")
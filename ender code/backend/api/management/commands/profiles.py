@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.profiling import list_profiles, summarize_profile
+
+SORT_KEYS = ['cumulative', 'tottime', 'calls', 'ncalls']
+
+
+class Command(BaseCommand):
+    help = ("List requests captured by on-demand profiling (X-Profile header or ?profile=), "
+            "or summarize one: its slowest functions and top allocation sites.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('profile_id', nargs='?', default=None, help='Profile to summarize (default: list them).')
+        parser.add_argument('--sort', choices=SORT_KEYS, default='cumulative', help='Order of the function table.')
+        parser.add_argument('--limit', type=int, default=20, help='Functions and allocation sites to show.')
+
+    def handle(self, *args, **options):
+        if options['profile_id'] is None:
+            self.list_captured()
+        else:
+            self.summarize(options['profile_id'], options['sort'], options['limit'])
+
+    def list_captured(self):
+        profiles = list_profiles()
+        if not profiles:
+            self.stdout.write("No profiles captured yet")
+            return
+        for p in profiles:
+            self.stdout.write(
+                f"{p['id']}  {p['method']} {p['path']} -> {p['status']}, "
+                f"{p['duration_ms']} ms, peak {p['peak_kb']} KB"
+            )
+
+    def summarize(self, profile_id, sort, limit):
+        try:
+            profile = summarize_profile(profile_id, sort=sort, limit=limit)
+        except FileNotFoundError:
+            raise CommandError(f"No profile {profile_id} (run without arguments to list them).")
+        self.stdout.write(f"{profile['method']} {profile['path']} -> {profile['status']}")
+        self.stdout.write(f"Captured {profile['created_at']}: {profile['duration_ms']} ms, "
+                          f"peak {profile['peak_kb']} KB traced")
+        self.stdout.write(profile['functions'])
+        self.stdout.write("Top allocation sites:")
+        for a in profile['top_allocations'][:limit]:
+            self.stdout.write(f"  {a['kb']:>9} KB {a['count']:>7} blocks  {a['file']}:{a['line']}")
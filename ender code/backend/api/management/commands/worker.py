@@ -0,0 +1,32 @@
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.taskqueue import run_next
+
+
+class Command(BaseCommand):
+    help = "Run queued background tasks. Start as many workers as needed; each job runs once."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sleep', type=float, default=1.0, help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty.')
+        parser.add_argument('--max-tasks', type=int, default=None, help='Exit after running this many tasks.')
+
+    def handle(self, *args, **options):
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.stdout.write(f"Worker {worker_id} started")
+        ran = 0
+        try:
+            while options['max_tasks'] is None or ran < options['max_tasks']:
+                if run_next(worker_id):
+                    ran += 1
+                elif options['burst']:
+                    break
+                else:
+                    time.sleep(options['sleep'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(f"Worker {worker_id} stopped after {ran} task(s)")
@@ -0,0 +1,234 @@
+"""Per-request timing and SQL instrumentation.
+
+`RequestTimingMiddleware` counts and times every SQL query a request runs,
+measures the view, the serialization of its data and the rendering of its
+response, and reports them in a `Server-Timing` header so the browser's
+network panel shows where each fetch spent its time:
+
+    db         SQL time, with the query count in the description
+    serialize  DRF serializers turning objects into response data, without their SQL
+    app        the rest of the view's time (Python outside SQL and serializers)
+    render     turning the response data into JSON
+    total      the whole request, including other middleware
+
+Serialization runs inside the view (`serializer.data`), so it is measured by
+wrapping the `data` property of DRF's Serializer and ListSerializer; the
+request being timed is found through a context variable.
+
+Requests slower than settings.SLOW_REQUEST_MS are logged as one JSON object
+to the `api.slow_requests` logger, with the most repeated SQL statements so
+N+1 query patterns stand out.
+
+`ProfilingMiddleware` runs a single request's view under cProfile and
+tracemalloc when an authorized user asks for it (see api/profiling.py).
+"""
+
+import json
+import logging
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+from rest_framework import serializers
+
+from .profiling import can_profile, profile_view, profiling_requested
+
+slow_logger = logging.getLogger('api.slow_requests')
+
+# The RequestTiming of the request being handled, if any
+_current_timing = ContextVar('request_timing', default=None)
+
+
+class QueryRecorder:
+    """A database execute wrapper that counts and times queries, grouped by SQL text."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+        self.statement_seconds = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.seconds += elapsed
+            self.statements[sql] += 1
+            self.statement_seconds[sql] += elapsed
+
+    def top_statements(self, n):
+        """The `n` statements run most often, with their count and total time."""
+        return [
+            {'sql': sql, 'count': count, 'ms': _ms(self.statement_seconds[sql])}
+            for sql, count in self.statements.most_common(n)
+        ]
+
+
+class RequestTiming:
+    """Timestamps and SQL recorded for one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.view_finished = None
+        self.queries = QueryRecorder()
+        self.serialize = 0.0
+        self.serializing = False
+
+    def finish(self):
+        now = time.perf_counter()
+        view_end = self.view_finished or now
+        self.total = now - self.started
+        self.view = view_end - self.view_started if self.view_started else 0.0
+        # Only template-style responses (DRF's Response) are rendered after the view returns
+        self.render = now - self.view_finished if self.view_finished else 0.0
+
+    @property
+    def app(self):
+        return max(self.view - self.queries.seconds - self.serialize, 0.0)
+
+    def server_timing(self):
+        return ', '.join([
+            f'db;dur={_ms(self.queries.seconds)};desc="{self.queries.count} queries"',
+            f'serialize;dur={_ms(self.serialize)}',
+            f'app;dur={_ms(self.app)}',
+            f'render;dur={_ms(self.render)}',
+            f'total;dur={_ms(self.total)}',
+        ])
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+def _timed_data(prop):
+    """Wrap a serializer's `data` property so its time counts towards the current request's serialize phase.
+
+    Only the outermost call is timed, so a serializer that reads another's
+    `data` isn't counted twice, and SQL run while serializing (lazy querysets,
+    related objects) is left in the db phase.
+    """
+    def data(serializer):
+        timing = _current_timing.get()
+        if timing is None or timing.serializing:
+            return prop.fget(serializer)
+        timing.serializing = True
+        started, sql = time.perf_counter(), timing.queries.seconds
+        try:
+            return prop.fget(serializer)
+        finally:
+            timing.serializing = False
+            timing.serialize += time.perf_counter() - started - (timing.queries.seconds - sql)
+    data._timed = True
+    return property(data, doc=prop.__doc__)
+
+
+def _instrument_serializers():
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        prop = cls.__dict__['data']
+        if not getattr(prop.fget, '_timed', False):
+            cls.data = _timed_data(prop)
+
+
+def _add_wrapper(wrapper):
+    connection.execute_wrappers.append(wrapper)
+
+
+def _remove_wrapper(wrapper):
+    connection.execute_wrappers.remove(wrapper)
+
+
+class RequestTimingMiddleware:
+    """Adds Server-Timing headers and logs slow requests (see the module docstring)."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        _instrument_serializers()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timing = request._timing = RequestTiming()
+        token = _current_timing.set(timing)
+        try:
+            with connection.execute_wrapper(timing.queries):
+                response = self.get_response(request)
+        finally:
+            _current_timing.reset(token)
+        return self.finish(request, response, timing)
+
+    async def __acall__(self, request):
+        timing = request._timing = RequestTiming()
+        # sync_to_async copies the context, so serializers run in the sync thread still see this timing
+        token = _current_timing.set(timing)
+        # Async views run their queries in the request's sync thread, so the wrapper goes on that thread's connection
+        await sync_to_async(_add_wrapper)(timing.queries)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(_remove_wrapper)(timing.queries)
+            _current_timing.reset(token)
+        return self.finish(request, response, timing)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._timing.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        request._timing.view_finished = time.perf_counter()
+        return response
+
+    def finish(self, request, response, timing):
+        timing.finish()
+        if settings.SERVER_TIMING_HEADER:
+            response.headers['Server-Timing'] = timing.server_timing()
+        if timing.total * 1000 >= settings.SLOW_REQUEST_MS:
+            slow_logger.warning(json.dumps({
+                'method': request.method,
+                'path': request.get_full_path(),
+                'status': response.status_code,
+                'total_ms': _ms(timing.total),
+                'view_ms': _ms(timing.view),
+                'serialize_ms': _ms(timing.serialize),
+                'render_ms': _ms(timing.render),
+                'db_ms': _ms(timing.queries.seconds),
+                'queries': timing.queries.count,
+                'top_queries': timing.queries.top_statements(settings.SLOW_REQUEST_TOP_QUERIES),
+            }))
+        return response
+
+
+class ProfilingMiddleware:
+    """Profiles the view when an authorized request asks for it (see api/profiling.py).
+
+    Goes last in MIDDLEWARE, so every other middleware's process_view has run
+    before this one calls the view itself.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        value = profiling_requested(request)
+        # Async views are left alone: cProfile only follows the thread it was enabled in
+        if not value or iscoroutinefunction(view_func) or not can_profile(request, value):
+            return None
+        return profile_view(request, view_func, view_args, view_kwargs)
@@ -0,0 +1,50 @@
+from django.db import migrations, models
+
+
+def move_content_to_blobs(apps, schema_editor):
+    from api.blobstore import put_text
+
+    AssignmentSubmissionFile = apps.get_model('api', 'AssignmentSubmissionFile')
+    for f in AssignmentSubmissionFile.objects.only('id', 'content').iterator():
+        f.content_hash, f.size = put_text(f.content)
+        f.save(update_fields=['content_hash', 'size'])
+
+
+def move_content_from_blobs(apps, schema_editor):
+    from api.blobstore import read_text
+
+    AssignmentSubmissionFile = apps.get_model('api', 'AssignmentSubmissionFile')
+    for f in AssignmentSubmissionFile.objects.only('id', 'content_hash').iterator():
+        f.content = read_text(f.content_hash)
+        f.save(update_fields=['content'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_assignmentdeadlineextension'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignmentsubmissionfile',
+            name='content_hash',
+            field=models.CharField(db_index=True, default='', max_length=64),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='assignmentsubmissionfile',
+            name='size',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='assignmentsubmissionfile',
+            name='content',
+            field=models.TextField(default=''),
+        ),
+        migrations.RunPython(move_content_to_blobs, move_content_from_blobs),
+        migrations.RemoveField(
+            model_name='assignmentsubmissionfile',
+            name='content',
+        ),
+    ]
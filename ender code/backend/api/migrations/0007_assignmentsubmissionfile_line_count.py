@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+def build_line_indexes(apps, schema_editor):
+    from api.blobstore import put_line_index, read_blob
+
+    AssignmentSubmissionFile = apps.get_model('api', 'AssignmentSubmissionFile')
+    for f in AssignmentSubmissionFile.objects.only('id', 'content_hash').iterator():
+        f.line_count = put_line_index(f.content_hash, read_blob(f.content_hash))
+        f.save(update_fields=['line_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_submission_file_blob_store'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignmentsubmissionfile',
+            name='line_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(build_line_indexes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_stats(apps, schema_editor):
+    Assignment = apps.get_model('api', 'Assignment')
+    AssignmentStats = apps.get_model('api', 'AssignmentStats')
+    AssignmentCommenter = apps.get_model('api', 'AssignmentCommenter')
+    AssignmentSubmission = apps.get_model('api', 'AssignmentSubmission')
+    AssignmentSubmissionComment = apps.get_model('api', 'AssignmentSubmissionComment')
+
+    submission_counts = dict(
+        AssignmentSubmission.objects.values('assignment_id').annotate(n=models.Count('id')).values_list('assignment_id', 'n')
+    )
+    per_user = (
+        AssignmentSubmissionComment.objects.values('submission__assignment_id', 'user_id')
+        .annotate(n=models.Count('id')).values_list('submission__assignment_id', 'user_id', 'n')
+    )
+    commenters = []
+    comment_counts = {}
+    commenter_counts = {}
+    for assignment_id, user_id, n in per_user:
+        commenters.append(AssignmentCommenter(assignment_id=assignment_id, user_id=user_id, comment_count=n))
+        comment_counts[assignment_id] = comment_counts.get(assignment_id, 0) + n
+        commenter_counts[assignment_id] = commenter_counts.get(assignment_id, 0) + 1
+    AssignmentCommenter.objects.bulk_create(commenters)
+    AssignmentStats.objects.bulk_create([
+        AssignmentStats(
+            assignment_id=assignment_id,
+            submission_count=submission_counts.get(assignment_id, 0),
+            comment_count=comment_counts.get(assignment_id, 0),
+            commenter_count=commenter_counts.get(assignment_id, 0),
+        )
+        for assignment_id in Assignment.objects.values_list('id', flat=True)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_assignmentsubmissionfile_line_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssignmentStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('submission_count', models.PositiveIntegerField(default=0)),
+                ('comment_count', models.PositiveIntegerField(default=0)),
+                ('commenter_count', models.PositiveIntegerField(default=0)),
+                ('assignment', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='api.assignment')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AssignmentCommenter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('comment_count', models.PositiveIntegerField(default=0)),
+                ('assignment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.assignment')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='api.user')),
+            ],
+            options={
+                'unique_together': {('assignment', 'user')},
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_assignment_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignmentsubmissioncomment',
+            index=models.Index(fields=['submission_file', 'start_line', 'end_line'], name='comment_file_lines_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_submission_current_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assignmentsubmissionfile',
+            name='linted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='LintResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64)),
+                ('linter', models.CharField(max_length=64)),
+                ('findings', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'unique_together': {('content_hash', 'linter')},
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_comment_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileDiff',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('old_hash', models.CharField(max_length=64)),
+                ('new_hash', models.CharField(max_length=64)),
+                ('opcodes', models.JSONField(default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'unique_together': {('old_hash', 'new_hash')},
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_linter_user(apps, schema_editor):
+    User = apps.get_model('api', 'User')
+    User.objects.filter(email=settings.LINTER_USER_EMAIL).update(is_system=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_file_diffs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='is_system',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_linter_user, migrations.RunPython.noop),
+    ]
@@ -2,12 +2,22 @@ from django.db import models
 from django.utils import timezone
 
 # Create your models here.
+class UserQuerySet(models.QuerySet):
+    def people(self):
+        """Leave out system accounts such as the linter user."""
+        return self.filter(is_system=False)
+
+
 class User(models.Model):
     is_teacher = models.BooleanField(default=False)
     #profile_pic = models.TextField(default="")
     name = models.CharField(max_length=255)
     email = models.EmailField(unique=True)
     #google_oauth_token = models.TextField(default="")
+    # Accounts that aren't people (see linting.get_linter_user); hidden from user listings and rosters
+    is_system = models.BooleanField(default=False)
+
+    objects = UserQuerySet.as_manager()
 
     def __str__(self):
         return self.name
@@ -34,6 +44,7 @@ class Assignment(models.Model):
     release_date = models.DateTimeField()
     submission_deadline = models.DateTimeField()
     commenting_deadline = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
@@ -62,12 +73,40 @@ class AssignmentGroup(models.Model):
         return f"Assignment Group {self.id}"
 
 
+class AssignmentSubmissionQuerySet(models.QuerySet):
+    def with_details(self):
+        """Prefetch the files and comments (with their authors) nested by SubmissionSerializer."""
+        comments = models.Prefetch('comments', queryset=AssignmentSubmissionComment.objects.select_related('user'))
+        return self.prefetch_related('files', comments)
+
+    def touch(self):
+        """Bump `updated_at` so cached copies of these submissions are revalidated."""
+        return self.update(updated_at=timezone.now())
+
+    def with_counts(self):
+        """Annotate each submission with its file and comment counts."""
+        return self.annotate(
+            file_count=models.Count('files', distinct=True),
+            comment_count=models.Count('comments', distinct=True),
+        )
+
+
 class AssignmentSubmission(models.Model):
     assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     submitted_at = models.DateTimeField(default=timezone.now)
     is_current = models.BooleanField()
     submitter_has_reviewed_comments = models.BooleanField(default=False)
+    # Also bumped when the submission's files or comments change (see signals.py)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = AssignmentSubmissionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Current-version lookups filter on all three (see tests.py)
+            models.Index(fields=['assignment', 'user', 'is_current'], name='submission_current_idx'),
+        ]
 
     def __str__(self):
         return f"Submission for assignment {self.assignment_id} by user {self.user_id}"
@@ -76,8 +115,29 @@ class AssignmentSubmission(models.Model):
 class AssignmentSubmissionFile(models.Model):
     name = models.CharField(max_length=255)
     submission = models.ForeignKey(AssignmentSubmission, related_name='files', on_delete=models.CASCADE)
-    content = models.TextField()
-    #content = models.BinaryField(editable=True)
+    # File bodies live in the content-addressed blob store (see blobstore.py)
+    content_hash = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveIntegerField(default=0)
+    line_count = models.PositiveIntegerField(default=0)
+    # Set once linting.py has attached linter comments for this file
+    linted = models.BooleanField(default=False)
+
+    def set_content(self, content):
+        """Store the file body and its line-offset index in the blob store and point this row at them."""
+        from .blobstore import put_blob, put_line_index
+        data = content.encode('utf-8')
+        self.content_hash, self.size = put_blob(data)
+        self.line_count = put_line_index(self.content_hash, data)
+
+    def read_content(self):
+        """Read the file body from the blob store."""
+        from .blobstore import read_text
+        return read_text(self.content_hash)
+
+    def read_lines(self, start, end):
+        """Read lines `start` through `end` (1-based, inclusive) from the blob store."""
+        from .blobstore import read_lines
+        return read_lines(self.content_hash, start, end)
 
     def __str__(self):
         return f"File {self.name} attached to submission {self.submission}"
@@ -111,6 +171,13 @@ class AssignmentSubmissionComment(models.Model):
 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     comment = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Supports line-window overlap queries (see comments.get_comments_in_window)
+            models.Index(fields=['submission_file', 'start_line', 'end_line'], name='comment_file_lines_idx'),
+        ]
 
     def __str__(self):
         return f"Comment on submission {self.submission_id}"
@@ -125,6 +192,7 @@ class AssignmentDeadlineExtension(models.Model):
     # This field represents an extended submission deadline (not commenting deadline)
     extended_submission_deadline = models.DateTimeField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = (('assignment', 'user'),)
@@ -133,3 +201,118 @@ class AssignmentDeadlineExtension(models.Model):
         target = 'ALL' if self.user is None else f'user {self.user_id}'
         return f"Submission-extension for assignment {self.assignment_id} -> {target} until {self.extended_submission_deadline}"
 
+
+
+class AssignmentStats(models.Model):
+    """Counters for the assignment dashboard, kept up to date by the handlers in signals.py."""
+    assignment = models.OneToOneField(Assignment, on_delete=models.CASCADE, related_name='stats')
+    submission_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    commenter_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Stats for assignment {self.assignment_id}"
+
+
+class AssignmentCommenter(models.Model):
+    """Number of comments a user has left on an assignment, used to maintain `AssignmentStats.commenter_count`."""
+    assignment = models.ForeignKey(Assignment, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    comment_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = (('assignment', 'user'),)
+
+    def __str__(self):
+        return f"User {self.user_id} commented {self.comment_count} times on assignment {self.assignment_id}"
+
+
+class LintResult(models.Model):
+    """Cached findings of one linter for one blob, keyed by content hash (see linting.py)."""
+    content_hash = models.CharField(max_length=64)
+    linter = models.CharField(max_length=64)
+    findings = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = (('content_hash', 'linter'),)
+
+    def __str__(self):
+        return f"{self.linter} results for {self.content_hash}"
+
+
+class FileDiff(models.Model):
+    """Cached line diff between two blobs, keyed by their content hashes (see diffs.py)."""
+    old_hash = models.CharField(max_length=64)
+    new_hash = models.CharField(max_length=64)
+    # difflib opcodes over the blobs' lines: [tag, i1, i2, j1, j2]
+    opcodes = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = (('old_hash', 'new_hash'),)
+
+    def __str__(self):
+        return f"Diff {self.old_hash} -> {self.new_hash}"
+
+
+class Task(models.Model):
+    """A queued background job, run by `manage.py worker` (see taskqueue.py)."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    status_choices = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=255)
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    priority = models.IntegerField(default=0)
+    status = models.CharField(max_length=10, choices=status_choices, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=255, blank=True, default='')
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Workers look for the next runnable job by status, priority and time
+            models.Index(fields=['status', '-priority', 'run_at'], name='task_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"Task {self.id} {self.name} ({self.status})"
+
+
+class CommentEvent(models.Model):
+    """A comment change on a submission, replayed to live comment streams (see events.py).
+
+    The primary key is the Server-Sent Events ID, so clients resume with `Last-Event-ID`.
+    """
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+    action_choices = [
+        (CREATE, 'Create'),
+        (UPDATE, 'Update'),
+        (DELETE, 'Delete'),
+    ]
+
+    # Not a foreign key: events outlive the comments (and submissions) they describe
+    submission_id = models.BigIntegerField(db_index=True)
+    comment_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=action_choices)
+    payload = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"Comment {self.comment_id} {self.action} on submission {self.submission_id}"
@@ -0,0 +1,35 @@
+"""Opt-in keyset pagination for the API.
+
+Lists are returned in full unless the client asks for a page with
+`?page_size=<n>` or follows a `cursor` link, so existing callers keep
+working. Pages are keyed on the primary key, so fetching page N costs the
+same as fetching page 1.
+"""
+
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+class OptionalCursorPagination(CursorPagination):
+    ordering = 'id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+class PaginatedListMixin:
+    """Adds `list_response` for custom list views and actions that build their own queryset."""
+
+    def list_response(self, queryset, serializer_class):
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = serializer_class(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = serializer_class(queryset, many=True)
+        return Response(serializer.data)
@@ -0,0 +1,150 @@
+"""On-demand profiling of single requests (see `ProfilingMiddleware`).
+
+A request opts in with the `X-Profile` header or the `?profile=` query
+parameter. If the requester is allowed to profile, its view runs under
+cProfile and tracemalloc, and two files are written to settings.PROFILING_DIR:
+
+    <id>.prof   cProfile stats, readable with pstats or snakeviz
+    <id>.json   the request, its timing and the top allocation sites
+
+`manage.py profiles` lists captured profiles and summarizes one of them.
+"""
+
+import cProfile
+import hmac
+import io
+import json
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_PARAM = 'profile'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+
+# cProfile and tracemalloc are process-wide, so only one request is profiled at a time
+_lock = threading.Lock()
+
+
+def profiling_requested(request):
+    """The value of the profiling header or query parameter, or None if the request didn't ask."""
+    return request.headers.get(PROFILE_HEADER) or request.GET.get(PROFILE_PARAM)
+
+
+def can_profile(request, value):
+    """Whether the requester may profile: a staff user logged in to the admin, or the PROFILING_TOKEN."""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated and user.is_staff:
+        return True
+    token = settings.PROFILING_TOKEN
+    return bool(token) and hmac.compare_digest(value.encode(), token.encode())
+
+
+def profile_view(request, view_func, view_args, view_kwargs):
+    """Call a view under cProfile and tracemalloc and save what they recorded.
+
+    Returns:
+        The view's response, or None if another request is being profiled
+    """
+    if not _lock.acquire(blocking=False):
+        return None
+    try:
+        already_tracing = tracemalloc.is_tracing()
+        if not already_tracing:
+            tracemalloc.start(settings.PROFILING_TRACEBACK_FRAMES)
+        tracemalloc.reset_peak()
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                response = view_func(request, *view_args, **view_kwargs)
+                # Render DRF responses here so serialization is part of the profile
+                if hasattr(response, 'render') and callable(response.render):
+                    response = response.render()
+            finally:
+                profiler.disable()
+            duration = time.perf_counter() - started
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            if not already_tracing:
+                tracemalloc.stop()
+        profile_id = save_profile(request, response, profiler, snapshot, duration, peak)
+    finally:
+        _lock.release()
+    response.headers[PROFILE_ID_HEADER] = profile_id
+    return response
+
+
+def save_profile(request, response, profiler, snapshot, duration, peak):
+    """Write the `.prof` and `.json` files for one profiled request.
+
+    Returns:
+        str: the profile ID, which both file names start with
+    """
+    directory = Path(settings.PROFILING_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    now = timezone.now()
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-')[:60] or 'root'
+    profile_id = f"{now:%Y%m%d-%H%M%S-%f}-{request.method.lower()}-{slug}"
+
+    profiler.dump_stats(directory / f'{profile_id}.prof')
+    # Leave out allocations made by the profilers themselves
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, cProfile.__file__),
+    ])
+    allocations = [
+        {
+            'file': stat.traceback[0].filename,
+            'line': stat.traceback[0].lineno,
+            'kb': round(stat.size / 1024, 1),
+            'count': stat.count,
+        }
+        for stat in snapshot.statistics('lineno')[:settings.PROFILING_TOP_ALLOCATIONS]
+    ]
+    with open(directory / f'{profile_id}.json', 'w') as f:
+        json.dump({
+            'id': profile_id,
+            'created_at': now.isoformat(),
+            'method': request.method,
+            'path': request.get_full_path(),
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 2),
+            'peak_kb': round(peak / 1024, 1),
+            'top_allocations': allocations,
+        }, f, indent=2)
+    return profile_id
+
+
+def list_profiles(directory=None):
+    """Metadata of every captured profile, newest first."""
+    directory = Path(directory or settings.PROFILING_DIR)
+    profiles = []
+    for path in directory.glob('*.json'):
+        with open(path) as f:
+            profiles.append(json.load(f))
+    return sorted(profiles, key=lambda p: p['created_at'], reverse=True)
+
+
+def summarize_profile(profile_id, sort='cumulative', limit=20, directory=None):
+    """The metadata of one profile plus its top `limit` functions as pstats text.
+
+    Raises:
+        FileNotFoundError: if there is no profile with that ID
+    """
+    directory = Path(directory or settings.PROFILING_DIR)
+    with open(directory / f'{profile_id}.json') as f:
+        profile = json.load(f)
+    out = io.StringIO()
+    stats = pstats.Stats(str(directory / f'{profile_id}.prof'), stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    profile['functions'] = out.getvalue()
+    return profile
@@ -0,0 +1,132 @@
+"""Set-based class roster import and sync.
+
+Every function here runs a fixed number of queries no matter how many
+emails are passed in, instead of several queries per student.
+"""
+
+import csv
+import io
+
+from django.db import transaction
+
+from .models import User
+
+ALLOWED_NEW_USER_DOMAIN = '@union.edu'
+
+
+def read_roster_csv(upload):
+    """Yield the email addresses in an uploaded CSV roster, one row at a time.
+
+    Uses the `email` column if the file has a header row containing one,
+    otherwise the first cell in each row that looks like an email address.
+
+    Args:
+        upload: binary file-like object (e.g. an UploadedFile)
+    """
+    reader = csv.reader(io.TextIOWrapper(upload, encoding='utf-8-sig', newline=''))
+    email_column = None
+    for row_number, row in enumerate(reader):
+        cells = [cell.strip() for cell in row]
+        if row_number == 0:
+            lowered = [cell.lower() for cell in cells]
+            if 'email' in lowered:
+                email_column = lowered.index('email')
+                continue
+        if email_column is not None:
+            if email_column < len(cells) and cells[email_column]:
+                yield cells[email_column]
+        else:
+            for cell in cells:
+                if '@' in cell:
+                    yield cell
+                    break
+
+
+def _clean_emails(emails):
+    """Strip and de-duplicate emails, keeping their original order."""
+    seen = {}
+    for email in emails:
+        if not isinstance(email, str):
+            continue
+        email = email.strip()
+        if email and email not in seen:
+            seen[email] = None
+    return list(seen)
+
+
+def resolve_users(emails):
+    """Look up users by email, creating any missing `@union.edu` users in bulk.
+
+    Args:
+        emails: Iterable of email addresses
+
+    Returns:
+        tuple: (dict of email -> User, list of emails that could not be resolved)
+    """
+    emails = _clean_emails(emails)
+    users = {u.email: u for u in User.objects.people().filter(email__in=emails)}
+
+    missing = [e for e in emails if e not in users]
+    creatable = [e for e in missing if e.endswith(ALLOWED_NEW_USER_DOMAIN)]
+    not_found = [e for e in missing if not e.endswith(ALLOWED_NEW_USER_DOMAIN)]
+
+    if creatable:
+        User.objects.bulk_create(
+            [User(email=e, name=e.split('@')[0].capitalize(), is_teacher=False) for e in creatable],
+            ignore_conflicts=True,
+        )
+        # Re-read so we have primary keys even if another request created some of them
+        users.update({u.email: u for u in User.objects.people().filter(email__in=creatable)})
+
+    return users, not_found
+
+
+def add_students(class_object, emails):
+    """Add students to a class roster with a single through-table insert.
+
+    Returns:
+        list: emails that could not be resolved to a user
+    """
+    with transaction.atomic():
+        users, not_found = resolve_users(emails)
+        Through = class_object.students.through
+        Through.objects.bulk_create(
+            [Through(class_id=class_object.id, user_id=u.id) for u in users.values()],
+            ignore_conflicts=True,
+        )
+    return not_found
+
+
+def sync_roster(class_object, emails):
+    """Make a class roster match the given emails exactly.
+
+    Only the difference is applied: students not yet enrolled are added and
+    enrolled students missing from `emails` are removed, in one transaction.
+
+    Returns:
+        dict: `added` and `removed` emails and `not_found` emails
+    """
+    with transaction.atomic():
+        users, not_found = resolve_users(emails)
+        target_ids = {u.id for u in users.values()}
+
+        Through = class_object.students.through
+        current = dict(
+            Through.objects.filter(class_id=class_object.id).values_list('user_id', 'user__email')
+        )
+
+        to_add = [u for u in users.values() if u.id not in current]
+        to_remove = [user_id for user_id in current if user_id not in target_ids]
+
+        Through.objects.bulk_create(
+            [Through(class_id=class_object.id, user_id=u.id) for u in to_add],
+            ignore_conflicts=True,
+        )
+        if to_remove:
+            Through.objects.filter(class_id=class_object.id, user_id__in=to_remove).delete()
+
+    return {
+        'added': [u.email for u in to_add],
+        'removed': [current[user_id] for user_id in to_remove],
+        'not_found': not_found,
+    }
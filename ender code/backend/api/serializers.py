@@ -44,6 +44,33 @@ class AssignmentDeadlineExtensionSerializer(serializers.ModelSerializer):
         model = AssignmentDeadlineExtension
         fields = ("id", "assignment", "user", "extended_submission_deadline", "created_at")
 
+class StudentDeadlineSerializer(serializers.Serializer):
+    user = UserSerializer(read_only=True)
+    effective_deadline = serializers.DateTimeField(read_only=True)
+    submitted_at = serializers.DateTimeField(read_only=True, allow_null=True)
+    status = serializers.CharField(read_only=True)
+
+class SubmissionSummarySerializer(serializers.ModelSerializer):
+    file_count = serializers.IntegerField(read_only=True)
+    comment_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = AssignmentSubmission
+        fields = ('id', 'submitted_at', 'submitter_has_reviewed_comments', 'file_count', 'comment_count')
+
+class MemberStatusSerializer(serializers.Serializer):
+    user = UserSerializer(read_only=True)
+    submission = SubmissionSummarySerializer(read_only=True, allow_null=True)
+    effective_deadline = serializers.DateTimeField(read_only=True)
+    extension = serializers.CharField(read_only=True, allow_null=True)
+    extension_active = serializers.BooleanField(read_only=True)
+
+class GroupStatusSerializer(serializers.Serializer):
+    id = serializers.IntegerField(read_only=True)
+    members = MemberStatusSerializer(many=True, read_only=True)
+    submission_count = serializers.IntegerField(read_only=True)
+    total_members = serializers.IntegerField(read_only=True)
+
 class AssignmentGroupSerializer(serializers.ModelSerializer):
     users = UserSerializer(many=True, read_only=True)
 
@@ -56,13 +83,18 @@ class AssignmentGroupSerializer(serializers.ModelSerializer):
 #
 
 class CommentSerializer(serializers.ModelSerializer):
+    # The author's name, so system users hidden from /api/users/ (the linter) still show up
+    user_name = serializers.CharField(source='user.name', read_only=True)
+
     class Meta:
         model = AssignmentSubmissionComment
         fields = (
             'id',
             'submission',
             'submission_file',
+            'comment_type',
             'user',
+            'user_name',
             'comment',
             'start_line',
             'end_line',
@@ -73,14 +105,51 @@ class CommentSerializer(serializers.ModelSerializer):
 
 
 class SubmissionFileSerializer(serializers.ModelSerializer):
+    # File bodies are read from and written to the blob store, not the row
+    content = serializers.CharField(source='read_content', allow_blank=True, trim_whitespace=False)
+
+    class Meta:
+        model = AssignmentSubmissionFile
+        fields = ('id', 'name', 'submission', 'content', 'content_hash', 'size', 'line_count')
+        read_only_fields = ('content_hash', 'size', 'line_count')
+
+    def create(self, validated_data):
+        content = validated_data.pop('read_content')
+        instance = AssignmentSubmissionFile(**validated_data)
+        instance.set_content(content)
+        instance.save()
+        return instance
+
+    def update(self, instance, validated_data):
+        content = validated_data.pop('read_content', None)
+        if content is not None:
+            instance.set_content(content)
+        return super().update(instance, validated_data)
+
+class SubmissionFileMetaSerializer(serializers.ModelSerializer):
     class Meta:
         model = AssignmentSubmissionFile
-        fields = ('id', 'name', 'submission', 'content')
+        fields = ('id', 'name', 'submission', 'content_hash', 'size', 'line_count')
 
 class SubmissionSerializer(serializers.ModelSerializer):
     comments = CommentSerializer(many=True, read_only=True)
-    files = SubmissionFileSerializer(many=True, read_only=True)
+    files = SubmissionFileMetaSerializer(many=True, read_only=True)
 
     class Meta:
         model = AssignmentSubmission
         fields = '__all__'
+
+
+class UploadFileSerializer(serializers.Serializer):
+    name = serializers.CharField(max_length=255)
+    content = serializers.CharField(allow_blank=True, trim_whitespace=False)
+
+class SubmissionUploadSerializer(serializers.Serializer):
+    assignment = serializers.PrimaryKeyRelatedField(queryset=Assignment.objects.all())
+    user = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
+    files = UploadFileSerializer(many=True, allow_empty=False)
+
+class SubmissionArchiveUploadSerializer(serializers.Serializer):
+    assignment = serializers.PrimaryKeyRelatedField(queryset=Assignment.objects.all())
+    user = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
+    archive = serializers.FileField()
@@ -0,0 +1,55 @@
+"""Signal handlers that keep `AssignmentStats` counters, submission version stamps and comment events up to date.
+
+Linter comments are machine generated and are not counted.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .events import record_comment_event
+from .models import AssignmentSubmission, AssignmentSubmissionComment, AssignmentSubmissionFile, CommentEvent
+from .stats import record_comments_created, record_comments_deleted, record_submissions
+
+
+def _comment_assignment_id(comment):
+    return AssignmentSubmission.objects.filter(pk=comment.submission_id).values_list('assignment_id', flat=True).first()
+
+
+@receiver(post_save, sender=AssignmentSubmission)
+def submission_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record_submissions(instance.assignment_id, 1)
+
+
+@receiver(post_delete, sender=AssignmentSubmission)
+def submission_deleted(sender, instance, **kwargs):
+    record_submissions(instance.assignment_id, -1)
+
+
+@receiver(post_save, sender=AssignmentSubmissionFile)
+@receiver(post_delete, sender=AssignmentSubmissionFile)
+def submission_file_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        AssignmentSubmission.objects.filter(pk=instance.submission_id).touch()
+
+
+@receiver(post_save, sender=AssignmentSubmissionComment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if not raw:
+        AssignmentSubmission.objects.filter(pk=instance.submission_id).touch()
+        record_comment_event(instance, CommentEvent.CREATE if created else CommentEvent.UPDATE)
+    if created and not raw and instance.comment_type != 'linter':
+        assignment_id = _comment_assignment_id(instance)
+        if assignment_id is not None:
+            record_comments_created(assignment_id, [instance.user_id])
+
+
+@receiver(post_delete, sender=AssignmentSubmissionComment)
+def comment_deleted(sender, instance, **kwargs):
+    AssignmentSubmission.objects.filter(pk=instance.submission_id).touch()
+    record_comment_event(instance, CommentEvent.DELETE)
+    if instance.comment_type == 'linter':
+        return
+    assignment_id = _comment_assignment_id(instance)
+    if assignment_id is not None:
+        record_comments_deleted(assignment_id, [instance.user_id])
@@ -0,0 +1,25 @@
+"""SQLite connection tuning.
+
+Every new database connection runs the PRAGMAs in settings.SQLITE_PRAGMAS
+(see backend/settings_production.py). Only `journal_mode` is stored in the
+database file; the other PRAGMAs last for the connection, which is why
+they are applied on connect rather than once by hand.
+"""
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def apply_pragmas(cursor, pragmas):
+    """Run `PRAGMA name = value` for each item of a {name: value} mapping."""
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(connection_created)
+def configure_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or not settings.SQLITE_PRAGMAS:
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, settings.SQLITE_PRAGMAS)
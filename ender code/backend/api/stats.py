@@ -0,0 +1,98 @@
+"""Incrementally maintained assignment statistics.
+
+`AssignmentStats` rows are updated as submissions and comments are created
+or deleted, so reading the dashboard numbers is a single-row lookup. The
+signal handlers in signals.py call these for single saves; code that uses
+`bulk_create` must call them itself since no signals are sent.
+"""
+
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.functions import Greatest
+
+from .models import AssignmentCommenter, AssignmentStats, AssignmentSubmission, AssignmentSubmissionComment
+
+
+def _adjust(assignment_id, **deltas):
+    """Add deltas to an assignment's counters, creating its stats row if needed."""
+    if any(delta > 0 for delta in deltas.values()):
+        AssignmentStats.objects.get_or_create(assignment_id=assignment_id)
+    AssignmentStats.objects.filter(assignment_id=assignment_id).update(**{
+        field: Greatest(F(field) + delta, 0) for field, delta in deltas.items() if delta
+    })
+
+
+def record_submissions(assignment_id, count=1):
+    """Record that `count` submissions were created (or deleted, if negative)."""
+    if count:
+        _adjust(assignment_id, submission_count=count)
+
+
+def record_comments_created(assignment_id, user_ids):
+    """Record new comments, given the author ID of each one."""
+    per_user = Counter(user_ids)
+    if not per_user:
+        return
+    with transaction.atomic():
+        new_commenters = 0
+        for user_id, count in per_user.items():
+            # Write before reading: on SQLite a transaction that reads first and then writes
+            # fails with "database is locked" instead of waiting when another writer is active
+            updated = AssignmentCommenter.objects.filter(assignment_id=assignment_id, user_id=user_id).update(
+                comment_count=F('comment_count') + count,
+            )
+            if not updated:
+                AssignmentCommenter.objects.create(assignment_id=assignment_id, user_id=user_id, comment_count=count)
+                new_commenters += 1
+        _adjust(assignment_id, comment_count=sum(per_user.values()), commenter_count=new_commenters)
+
+
+def record_comments_deleted(assignment_id, user_ids):
+    """Record deleted comments, given the author ID of each one."""
+    per_user = Counter(user_ids)
+    if not per_user:
+        return
+    with transaction.atomic():
+        # Write first, as in record_comments_created, then drop commenters left without comments
+        for user_id, count in per_user.items():
+            AssignmentCommenter.objects.filter(assignment_id=assignment_id, user_id=user_id).update(
+                comment_count=Greatest(F('comment_count') - count, 0),
+            )
+        gone_commenters, _ = AssignmentCommenter.objects.filter(
+            assignment_id=assignment_id, user_id__in=per_user, comment_count__lte=0,
+        ).delete()
+        _adjust(assignment_id, comment_count=-sum(per_user.values()), commenter_count=-gone_commenters)
+
+
+def rebuild_assignment_stats(assignment_id):
+    """Recompute an assignment's counters from scratch with SQL aggregates."""
+    with transaction.atomic():
+        per_user = dict(
+            AssignmentSubmissionComment.objects.filter(submission__assignment_id=assignment_id)
+            .exclude(comment_type='linter')
+            .values('user_id').annotate(n=Count('id')).values_list('user_id', 'n')
+        )
+        AssignmentCommenter.objects.filter(assignment_id=assignment_id).delete()
+        AssignmentCommenter.objects.bulk_create([
+            AssignmentCommenter(assignment_id=assignment_id, user_id=user_id, comment_count=n)
+            for user_id, n in per_user.items()
+        ])
+        AssignmentStats.objects.update_or_create(assignment_id=assignment_id, defaults={
+            'submission_count': AssignmentSubmission.objects.filter(assignment_id=assignment_id).count(),
+            'comment_count': sum(per_user.values()),
+            'commenter_count': len(per_user),
+        })
+
+
+def get_assignment_stats(assignment_id):
+    """Get the dashboard counters for an assignment.
+    
+    Returns:
+        dict: `submission_count`, `comment_count` and `commenter_count`
+    """
+    stats = AssignmentStats.objects.filter(assignment_id=assignment_id).values(
+        'submission_count', 'comment_count', 'commenter_count'
+    ).first()
+    return stats or {'submission_count': 0, 'comment_count': 0, 'commenter_count': 0}
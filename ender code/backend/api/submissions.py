@@ -0,0 +1,65 @@
+"""Creating submission versions in a single transaction."""
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AssignmentSubmission, AssignmentSubmissionFile
+from .tasks import lint_submission
+
+
+def store_files(files):
+    """Write file bodies to the blob store and build unsaved file rows for them.
+
+    Contents are consumed one at a time, so `files` can be a generator over
+    an archive without holding more than one body in memory.
+
+    Args:
+        files: Iterable of (name, content) pairs, content as str
+
+    Returns:
+        list: unsaved AssignmentSubmissionFile rows without a submission
+    """
+    file_rows = []
+    for name, content in files:
+        row = AssignmentSubmissionFile(name=name)
+        row.set_content(content)
+        file_rows.append(row)
+    return file_rows
+
+
+def save_submission(assignment, user, file_rows):
+    """Save a new current submission version and its stored file rows.
+
+    The transaction is an UPDATE of the previous version, one INSERT for the
+    submission and one bulk INSERT for its files.
+
+    Returns:
+        AssignmentSubmission: the new current submission
+    """
+    with transaction.atomic():
+        AssignmentSubmission.objects.filter(
+            assignment=assignment, user=user, is_current=True
+        ).update(is_current=False, updated_at=timezone.now())
+        submission = AssignmentSubmission.objects.create(assignment=assignment, user=user, is_current=True)
+        for row in file_rows:
+            row.submission = submission
+        AssignmentSubmissionFile.objects.bulk_create(file_rows)
+        lint_submission.enqueue(submission.id)
+    return submission
+
+
+def create_submission(assignment, user, files):
+    """Create a new current submission version with all of its files.
+
+    File bodies are written to the blob store before the transaction opens
+    so it stays short.
+
+    Args:
+        assignment: Assignment instance
+        user: User instance
+        files: Iterable of (name, content) pairs, content as str
+
+    Returns:
+        AssignmentSubmission: the new current submission
+    """
+    return save_submission(assignment, user, store_files(files))
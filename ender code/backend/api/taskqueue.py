@@ -0,0 +1,163 @@
+"""A small database-backed task queue.
+
+Functions decorated with `@task` can be queued from view code with
+`.enqueue(...)`; the job row is only written once the surrounding
+transaction commits. `manage.py worker` processes run the jobs. Jobs are
+claimed with a compare-and-set UPDATE, so any number of workers can run at
+once without running a job twice, and failed jobs are retried with
+exponential backoff up to `max_attempts` times.
+"""
+
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+# Registered task functions by name
+TASKS = {}
+
+
+class TaskFunction:
+    """Wraps a task function; calling it runs it inline, `enqueue` defers it to a worker."""
+
+    def __init__(self, func, name, priority, max_attempts):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, priority=None, delay=None, **kwargs):
+        """Queue a call to this task once the current transaction commits.
+
+        Arguments must be JSON serializable.
+
+        Args:
+            priority: overrides the task's default priority (higher runs first)
+            delay: seconds or timedelta to wait before the job may run
+        """
+        if isinstance(delay, (int, float)):
+            delay = timedelta(seconds=delay)
+        job = dict(
+            name=self.name,
+            args=list(args),
+            kwargs=kwargs,
+            priority=self.priority if priority is None else priority,
+            max_attempts=self.max_attempts,
+        )
+
+        def create():
+            Task.objects.create(run_at=timezone.now() + (delay or timedelta()), **job)
+
+        transaction.on_commit(create)
+
+
+def task(func=None, *, name=None, priority=0, max_attempts=3):
+    """Register a function as a queueable task.
+
+    Can be used bare (`@task`) or with options (`@task(priority=5)`).
+    """
+    def register(func):
+        task_name = name or f'{func.__module__}.{func.__qualname__}'
+        wrapper = TaskFunction(func, task_name, priority, max_attempts)
+        TASKS[task_name] = wrapper
+        return wrapper
+
+    if func is not None:
+        return register(func)
+    return register
+
+
+def claim_task(worker_id):
+    """Atomically claim the next runnable job and count the attempt.
+
+    Jobs left running by a worker that died are reclaimed once their lock
+    is older than settings.TASK_LOCK_TIMEOUT seconds. The attempt is counted
+    when the job is claimed, so a job that keeps killing its worker is
+    marked failed after `max_attempts` claims instead of blocking the queue.
+
+    Returns:
+        Task or None
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.TASK_LOCK_TIMEOUT)
+    runnable = (
+        Task.objects.filter(status=Task.QUEUED, run_at__lte=now)
+        | Task.objects.filter(status=Task.RUNNING, locked_at__lt=stale)
+    )
+    candidates = runnable.order_by('-priority', 'run_at', 'id').values(
+        'id', 'status', 'locked_at', 'attempts', 'max_attempts',
+    )[:10]
+    for candidate in candidates:
+        # Compare-and-set: only one worker's UPDATE can match the row as it was read
+        current = Task.objects.filter(id=candidate['id'], status=candidate['status'], locked_at=candidate['locked_at'])
+        if candidate['attempts'] >= candidate['max_attempts']:
+            current.update(
+                status=Task.FAILED, locked_by='', locked_at=None, updated_at=now,
+                last_error=f"Worker stopped during attempt {candidate['attempts']} and no attempts are left",
+            )
+            logger.error('Task %s failed: its worker stopped on the last attempt', candidate['id'])
+            continue
+        claimed = current.update(
+            status=Task.RUNNING, locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1, updated_at=now,
+        )
+        if claimed:
+            return Task.objects.get(id=candidate['id'])
+    return None
+
+
+def run_task(job):
+    """Run a claimed job and record its outcome, scheduling a retry on failure.
+
+    The outcome is only written while the job is still locked by this claim;
+    if it was reclaimed as stale in the meantime the new owner's state wins.
+    """
+    func = TASKS.get(job.name)
+    try:
+        if func is None:
+            raise LookupError(f'Unknown task {job.name}')
+        func(*job.args, **job.kwargs)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            backoff = settings.TASK_RETRY_BACKOFF * 2 ** (job.attempts - 1)
+            job.status = Task.QUEUED
+            job.run_at = timezone.now() + timedelta(seconds=backoff)
+        else:
+            job.status = Task.FAILED
+        logger.exception('Task %s (%s) failed on attempt %s', job.id, job.name, job.attempts)
+    else:
+        job.status = Task.DONE
+        job.last_error = ''
+    saved = Task.objects.filter(pk=job.pk, locked_by=job.locked_by, locked_at=job.locked_at).update(
+        status=job.status, run_at=job.run_at, last_error=job.last_error,
+        locked_by='', locked_at=None, updated_at=timezone.now(),
+    )
+    if not saved:
+        logger.warning('Task %s (%s) was reclaimed by another worker; dropping this result', job.id, job.name)
+        return False
+    return job.status == Task.DONE
+
+
+def run_next(worker_id):
+    """Claim and run one job.
+
+    Returns:
+        bool: False if there was nothing to run
+    """
+    job = claim_task(worker_id)
+    if job is None:
+        return False
+    run_task(job)
+    return True
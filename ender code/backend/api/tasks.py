@@ -0,0 +1,17 @@
+"""Background tasks run by `manage.py worker`."""
+
+from .linting import lint_files
+from .models import AssignmentSubmissionFile
+from .taskqueue import task
+
+
+@task(priority=-1)
+def lint_submission(submission_id):
+    """Lint the files of a submission that haven't been linted yet."""
+    lint_files(AssignmentSubmissionFile.objects.filter(submission_id=submission_id, linted=False))
+
+
+@task(priority=-1)
+def lint_submission_file(file_id):
+    """Lint a single submission file if it hasn't been linted yet."""
+    lint_files(AssignmentSubmissionFile.objects.filter(id=file_id, linted=False))
@@ -1,3 +1,1190 @@
-from django.test import TestCase
+"""Query-count and query-plan regression tests for the API.
 
-# Create your tests here.
+Each endpoint is requested against a seeded class of realistic size and
+must stay under a fixed number of SQL queries, so N+1 patterns fail the
+suite instead of showing up on deadline night. Every SELECT an endpoint
+runs is also passed through SQLite's EXPLAIN QUERY PLAN, and full table
+scans fail unless the endpoint is expected to read the whole table.
+"""
+
+import importlib
+import io
+import json
+import os
+import re
+import shutil
+import sys
+import tarfile
+import tempfile
+import time
+import zipfile
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User as AuthUser
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+
+from .diffs import get_opcodes, remap_range
+from .linting import get_linter_user, lint_files, parse_findings
+from .models import (
+    User, Class, Assignment, AssignmentGroup, AssignmentSubmission,
+    AssignmentSubmissionFile, AssignmentSubmissionComment, AssignmentDeadlineExtension, AssignmentCommenter, CommentEvent,
+    FileDiff, LintResult, Task,
+)
+from .roster import read_roster_csv
+from .serializers import UserSerializer
+from .sqlite import configure_connection
+from .stats import get_assignment_stats, rebuild_assignment_stats
+from .submissions import create_submission
+from .taskqueue import claim_task, run_next, run_task, task
+from .utils import get_effective_deadline, get_effective_deadlines, get_submission_statuses
+
+STUDENTS = 150
+GROUP_SIZE = 3
+VERSIONS_PER_STUDENT = 2
+FILES_PER_SUBMISSION = 2
+COMMENTS_PER_FILE = 2
+
+BLOB_ROOT = tempfile.mkdtemp(prefix='api-tests-blobs-')
+
+FULL_SCAN = re.compile(r'\bSCAN (\w+)(?! USING)')
+
+
+def seed_class():
+    """Create a class with groups, submission history, comments and extensions."""
+    now = timezone.now()
+    teacher = User.objects.create(name='Teacher', email='teacher@union.edu', is_teacher=True)
+    course = Class.objects.create(
+        code='CSC-106', name='Data Structures', term='F', year=2025,
+        start_date=now.date(), end_date=now.date(), teacher=teacher,
+    )
+    User.objects.bulk_create([
+        User(name=f'Student {i}', email=f'student{i}@union.edu') for i in range(STUDENTS)
+    ])
+    students = list(User.objects.filter(is_teacher=False).order_by('id'))
+    course.students.set(students)
+
+    assignment = Assignment.objects.create(
+        course=course, name='Project', description='',
+        release_date=now - timedelta(days=7),
+        submission_deadline=now - timedelta(days=1),
+        commenting_deadline=now + timedelta(days=7),
+    )
+
+    for i in range(0, STUDENTS, GROUP_SIZE):
+        group = AssignmentGroup.objects.create(assignment=assignment)
+        group.users.set(students[i:i + GROUP_SIZE])
+
+    AssignmentDeadlineExtension.objects.create(
+        assignment=assignment, user=None, extended_submission_deadline=now + timedelta(hours=1),
+    )
+    AssignmentDeadlineExtension.objects.bulk_create([
+        AssignmentDeadlineExtension(assignment=assignment, user=s, extended_submission_deadline=now + timedelta(days=2))
+        for s in students[:20]
+    ])
+
+    AssignmentSubmission.objects.bulk_create([
+        AssignmentSubmission(
+            assignment=assignment, user=s, is_current=(version == VERSIONS_PER_STUDENT - 1),
+            submitted_at=now - timedelta(days=3 - version),
+        )
+        for s in students for version in range(VERSIONS_PER_STUDENT)
+    ])
+    submissions = list(AssignmentSubmission.objects.filter(assignment=assignment))
+
+    files = []
+    for submission in submissions:
+        for n in range(FILES_PER_SUBMISSION):
+            f = AssignmentSubmissionFile(submission=submission, name=f'file{n}.py')
+            f.set_content(''.join(f'line {line} of file {n}\n' for line in range(200)))
+            files.append(f)
+    AssignmentSubmissionFile.objects.bulk_create(files)
+    files = list(AssignmentSubmissionFile.objects.select_related('submission'))
+
+    comments = [
+        AssignmentSubmissionComment(
+            submission=f.submission, submission_file=f, comment_type='file', user=students[(f.id + c) % STUDENTS],
+            start_line=10 * c + 1, end_line=10 * c + 3, start_offset=0, end_offset=5, comment='Looks good',
+        )
+        for f in files for c in range(COMMENTS_PER_FILE)
+    ]
+    AssignmentSubmissionComment.objects.bulk_create(comments)
+
+    return teacher, course, assignment, students
+
+
+def seed_submission():
+    """Create a teacher, a student, a class, an assignment and one current submission."""
+    teacher = User.objects.create(email='teacher@union.edu', name='Teacher', is_teacher=True)
+    student = User.objects.create(email='student@union.edu', name='Student', is_teacher=False)
+    now = timezone.now()
+    course = Class.objects.create(
+        code='CSC-120', name='Intro', term='Fall', year=2025,
+        start_date=now.date(), end_date=(now + timedelta(days=90)).date(), teacher=teacher,
+    )
+    assignment = Assignment.objects.create(
+        course=course, name='Project 1', description='',
+        release_date=now - timedelta(days=7), submission_deadline=now + timedelta(days=1),
+        commenting_deadline=now + timedelta(days=7),
+    )
+    submission = AssignmentSubmission.objects.create(assignment=assignment, user=student, is_current=True)
+    return teacher, student, course, assignment, submission
+
+
+@override_settings(SUBMISSION_BLOB_ROOT=BLOB_ROOT)
+class EndpointQueryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        with override_settings(SUBMISSION_BLOB_ROOT=BLOB_ROOT):
+            cls.teacher, cls.course, cls.assignment, cls.students = seed_class()
+        cls.student = cls.students[-1]
+        cls.submission = AssignmentSubmission.objects.filter(user=cls.student, is_current=True).first()
+        cls.file = cls.submission.files.first()
+        cls.group = AssignmentGroup.objects.filter(users=cls.student).first()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(BLOB_ROOT, ignore_errors=True)
+
+    def request(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, data, content_type='application/json')
+        self.assertLess(response.status_code, 400, f'{method.upper()} {url} returned {response.status_code}')
+        return response, ctx.captured_queries
+
+    def full_scans(self, queries):
+        """Run EXPLAIN QUERY PLAN on every SELECT and return the tables that were fully scanned."""
+        scanned = set()
+        with connection.cursor() as cursor:
+            for query in queries:
+                sql = query['sql']
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+                for row in cursor.fetchall():
+                    scanned.update(FULL_SCAN.findall(row[-1]))
+        return scanned
+
+    def check(self, url, max_queries, method='get', data=None, allow_scans=()):
+        response, queries = self.request(method, url, data)
+        self.assertLessEqual(
+            len(queries), max_queries,
+            f'{method.upper()} {url} ran {len(queries)} queries:\n' + '\n'.join(q['sql'] for q in queries),
+        )
+        scans = self.full_scans(queries) - set(allow_scans)
+        self.assertFalse(scans, f'{method.upper()} {url} fully scanned {sorted(scans)}')
+        return response
+
+    def query_plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return ' '.join(row[-1] for row in cursor.fetchall())
+
+    # Indexes
+
+    def test_current_submission_lookup_uses_composite_index(self):
+        queryset = AssignmentSubmission.objects.filter(assignment=self.assignment, user=self.student, is_current=True)
+        self.assertIn('submission_current_idx', self.query_plan(queryset))
+
+    def test_extension_lookup_uses_unique_index(self):
+        queryset = AssignmentDeadlineExtension.objects.filter(assignment=self.assignment, user=self.student)
+        self.assertRegex(self.query_plan(queryset), r'USING INDEX \w+ \(assignment_id=\? AND user_id=\?\)')
+
+    def test_comment_window_uses_line_index(self):
+        queryset = AssignmentSubmissionComment.objects.filter(
+            submission_file=self.file, parent__isnull=True, start_line__lte=50, end_line__gte=40,
+        )
+        self.assertIn('comment_file_lines_idx', self.query_plan(queryset))
+
+    # Users
+
+    def test_user_list(self):
+        self.check('/api/users/', 1, allow_scans={'api_user'})
+
+    def test_user_list_paginated(self):
+        # Keyset pages walk the primary key and stop at the page size, which SQLite still reports as a SCAN
+        response = self.check('/api/users/?page_size=50', 1, allow_scans={'api_user'})
+        self.assertEqual(len(response.json()['results']), 50)
+
+    def test_user_by_email(self):
+        self.check(f'/api/users/?email={self.student.email}', 1)
+
+    def test_user_detail(self):
+        self.check(f'/api/users/{self.student.id}/', 1)
+
+    # Classes
+
+    def test_classes_for_teacher(self):
+        self.check(f'/api/classes/?teacher={self.teacher.id}', 1)
+
+    def test_classes_for_student(self):
+        self.check(f'/api/classes/?student={self.student.id}', 1)
+
+    def test_class_assignments(self):
+        self.check(f'/api/classes/{self.course.id}/assignments/', 2)
+
+    def test_class_roster(self):
+        self.check(f'/api/classes/{self.course.id}/roster/', 2)
+
+    def test_class_roster_bulk_add(self):
+        emails = [s.email for s in self.students[:100]] + [f'new{i}@union.edu' for i in range(100)]
+        self.check(f'/api/classes/{self.course.id}/roster/', 12, method='patch', data={'students': emails})
+        self.assertEqual(self.course.students.count(), STUDENTS + 100)
+
+    def test_class_roster_sync(self):
+        emails = [s.email for s in self.students[50:]] + ['new@union.edu']
+        response = self.check(f'/api/classes/{self.course.id}/roster/', 14, method='patch',
+                              data={'students': emails, 'action': 'sync'})
+        self.assertEqual(len(response.json()['removed']), 50)
+        self.assertEqual(response.json()['added'], ['new@union.edu'])
+
+    # Assignments
+
+    def test_assignment_detail(self):
+        self.check(f'/api/assignments/{self.assignment.id}/', 1)
+
+    def test_assignment_groups(self):
+        self.check(f'/api/assignments/{self.assignment.id}/groups/', 2)
+
+    def test_assignment_groups_for_student(self):
+        self.check(f'/api/assignments/{self.assignment.id}/groups/?student={self.student.id}', 2)
+
+    def test_assignment_extensions(self):
+        self.check(f'/api/assignments/{self.assignment.id}/extensions/', 2)
+
+    def test_assignment_group_create(self):
+        emails = [s.email for s in self.students[:3]] + ['outsider@union.edu', {'email': 'x'}, ['y']]
+        self.check(f'/api/assignments/{self.assignment.id}/groups/', 7, method='post', data={'students': emails})
+        group = AssignmentGroup.objects.filter(assignment=self.assignment).latest('id')
+        self.assertEqual(set(group.users.all()), set(self.students[:3]))
+
+    def test_assignment_groups_bulk_balanced(self):
+        response = self.check(f'/api/assignments/{self.assignment.id}/groups/bulk/', 11, method='post',
+                              data={'size': 4, 'strategy': 'balanced', 'seed': 1, 'replace': True})
+        sizes = [len(g['users']) for g in response.json()['groups']]
+        self.assertEqual(len(sizes), -(-STUDENTS // 4))
+        self.assertEqual(set(sizes), {3, 4})
+        members = [u['id'] for g in response.json()['groups'] for u in g['users']]
+        self.assertEqual(sorted(members), sorted(s.id for s in self.students))
+        self.assertEqual(AssignmentGroup.objects.filter(assignment=self.assignment).count(), len(sizes))
+
+    def test_assignment_groups_bulk_explicit(self):
+        student_ids = {s.email: s.id for s in self.students}
+        emails = list(student_ids)
+        groups = [emails[i:i + 2] for i in range(0, STUDENTS, 2)] + [[emails[0], 'outsider@union.edu']]
+        response = self.check(f'/api/assignments/{self.assignment.id}/groups/bulk/', 11, method='post',
+                              data={'groups': groups, 'replace': True})
+        data = response.json()
+        self.assertEqual(len(data['groups']), STUDENTS // 2)
+        self.assertEqual(data['not_enrolled'], ['outsider@union.edu'])
+        self.assertEqual(data['already_grouped'], [emails[0]])
+        first = next(g for g in data['groups'] if student_ids[emails[0]] in [u['id'] for u in g['users']])
+        self.assertEqual({u['email'] for u in first['users']}, set(emails[:2]))
+
+    def test_assignment_groups_bulk_skips_grouped_students(self):
+        response = self.check(f'/api/assignments/{self.assignment.id}/groups/bulk/', 5, method='post', data={'size': 3})
+        self.assertEqual(response.json()['groups'], [])
+        response = self.client.post(f'/api/assignments/{self.assignment.id}/groups/bulk/', {'size': 0},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_assignment_deadlines(self):
+        response = self.check(f'/api/assignments/{self.assignment.id}/deadlines/', 4)
+        self.assertEqual(len(response.json()), STUDENTS)
+
+    def test_assignment_status(self):
+        response = self.check(f'/api/assignments/{self.assignment.id}/status/', 5)
+        self.assertEqual(len(response.json()), STUDENTS // GROUP_SIZE)
+
+    def test_assignment_stats(self):
+        self.check(f'/api/assignments/{self.assignment.id}/stats/', 2)
+
+    def test_assignment_submissions(self):
+        response = self.check(f'/api/assignments/{self.assignment.id}/submissions/', 3)
+        self.assertEqual(len(response.json()), STUDENTS * VERSIONS_PER_STUDENT)
+
+    def test_assignment_current_submission_for_student(self):
+        url = (f'/api/assignments/{self.assignment.id}/submissions/'
+               f'?student={self.student.id}&current=true&requester={self.teacher.id}')
+        self.check(url, 5)
+
+    # Submissions, files and comments
+
+    def test_submission_detail(self):
+        self.check(f'/api/submit/{self.submission.id}/', 4)
+
+    def test_submission_upload(self):
+        previous = self.submission
+        data = {
+            'assignment': self.assignment.id,
+            'user': self.student.id,
+            'files': [{'name': f'file{n}.py', 'content': f'print({n})\n'} for n in range(20)],
+        }
+        response = self.check('/api/submit/upload/', 15, method='post', data=data)
+        self.assertEqual(len(response.json()['files']), 20)
+        current = AssignmentSubmission.objects.filter(assignment=self.assignment, user=self.student, is_current=True)
+        self.assertEqual([s.id for s in current], [response.json()['id']])
+        self.assertNotEqual(previous.id, response.json()['id'])
+
+    def test_submission_upload_rejects_invalid_payload(self):
+        response = self.client.post('/api/submit/upload/', {
+            'assignment': self.assignment.id, 'user': self.student.id, 'files': [],
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(AssignmentSubmission.objects.filter(user=self.student).count(), VERSIONS_PER_STUDENT)
+
+    def test_submission_archive_upload_zip(self):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as archive:
+            archive.writestr('project/', '')
+            archive.writestr('project/main.py', 'print("hi")\n')
+            archive.writestr('project/util.py', 'x = 1\n')
+            archive.writestr('project/logo.png', b'\x89PNG\r\n\x1a\n\0\0')
+            archive.writestr('__MACOSX/project/._main.py', b'\0')
+            # Paths that would leave the submission's folder are dropped
+            for name in ('..', '../escape.py', 'project/../../up.py'):
+                archive.writestr(name, 'x = 1\n')
+        upload = SimpleUploadedFile('project.zip', buffer.getvalue())
+        with override_settings(SUBMISSION_ARCHIVE_MAX_FILE_SIZE=64):
+            response = self.client.post('/api/submit/upload/archive/', {
+                'assignment': self.assignment.id, 'user': self.student.id, 'archive': upload,
+            })
+        self.assertEqual(response.status_code, 201)
+        names = sorted(f['name'] for f in response.json()['submission']['files'])
+        self.assertEqual(names, ['project/main.py', 'project/util.py'])
+        self.assertEqual(response.json()['skipped'], [{'name': 'project/logo.png', 'reason': 'binary'}])
+
+    def test_submission_archive_upload_tar_skips_oversized(self):
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode='w:gz') as archive:
+            for name, body in (('small.py', b'pass\n'), ('big.py', b'#' * 100)):
+                info = tarfile.TarInfo(name)
+                info.size = len(body)
+                archive.addfile(info, io.BytesIO(body))
+        upload = SimpleUploadedFile('project.tar.gz', buffer.getvalue())
+        with override_settings(SUBMISSION_ARCHIVE_MAX_FILE_SIZE=64):
+            response = self.client.post('/api/submit/upload/archive/', {
+                'assignment': self.assignment.id, 'user': self.student.id, 'archive': upload,
+            })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([f['name'] for f in response.json()['submission']['files']], ['small.py'])
+        self.assertEqual(response.json()['skipped'], [{'name': 'big.py', 'reason': 'too_large'}])
+
+    def test_submission_archive_upload_rejects_non_archive(self):
+        upload = SimpleUploadedFile('notes.txt', b'just some text')
+        response = self.client.post('/api/submit/upload/archive/', {
+            'assignment': self.assignment.id, 'user': self.student.id, 'archive': upload,
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_assignment_export_zip(self):
+        response = self.client.get(f'/api/assignments/{self.assignment.id}/export.zip/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archive:
+            self.assertIsNone(archive.testzip())
+            names = archive.namelist()
+            self.assertEqual(len(names), STUDENTS * FILES_PER_SUBMISSION)
+            folder = self.student.email.split('@')[0]
+            self.assertEqual(
+                archive.read(f'{folder}/file0.py').decode(),
+                self.submission.files.get(name='file0.py').read_content(),
+            )
+
+    async def test_assignment_export_zip_streams_under_asgi(self):
+        response = await self.async_client.get(f'/api/assignments/{self.assignment.id}/export.zip/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertGreater(len(chunks), 1)
+        with zipfile.ZipFile(io.BytesIO(b''.join(chunks))) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(len(archive.namelist()), STUDENTS * FILES_PER_SUBMISSION)
+
+    def test_submission_comment_tree(self):
+        self.check(f'/api/submit/{self.submission.id}/comments/tree/?file={self.file.id}', 2)
+
+    def test_file_detail(self):
+        self.check(f'/api/addfile/{self.file.id}/', 1)
+
+    def test_file_lines(self):
+        response = self.check(f'/api/addfile/{self.file.id}/lines/?start=10&end=19', 1)
+        self.assertEqual(response.json()['lines'][0], 'line 9 of file 0')
+
+    def test_file_comment_window(self):
+        self.check(f'/api/addfile/{self.file.id}/comments/?start=1&end=5', 3)
+
+    def test_group_detail(self):
+        self.check(f'/api/groups/{self.group.id}/', 2)
+
+
+class DeadlineStatusTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher, first, cls.course, cls.assignment, _ = seed_submission()
+        cls.now = timezone.now()
+        cls.deadline = cls.now - timedelta(days=2)
+        Assignment.objects.filter(id=cls.assignment.id).update(submission_deadline=cls.deadline)
+        cls.assignment.refresh_from_db()
+        AssignmentSubmission.objects.all().delete()
+        cls.on_time, cls.late, cls.missing, cls.extended = [first] + [
+            User.objects.create(email=f'{name}@union.edu', name=name) for name in ('late', 'missing', 'extended')
+        ]
+        cls.course.students.set([cls.on_time, cls.late, cls.missing, cls.extended])
+        for user, days_ago in ((cls.on_time, 3), (cls.late, 1), (cls.extended, 1)):
+            AssignmentSubmission.objects.create(assignment=cls.assignment, user=user, is_current=True,
+                                                submitted_at=cls.now - timedelta(days=days_ago))
+        # An older late version doesn't count once a newer one is current
+        AssignmentSubmission.objects.create(assignment=cls.assignment, user=cls.on_time, is_current=False,
+                                            submitted_at=cls.now - timedelta(days=1))
+
+    def statuses(self):
+        return {s['user'].id: (s['status'], s['effective_deadline']) for s in get_submission_statuses(self.assignment)}
+
+    def test_on_time_late_and_missing(self):
+        statuses = self.statuses()
+        self.assertEqual(statuses[self.on_time.id], ('on_time', self.deadline))
+        self.assertEqual(statuses[self.late.id], ('late', self.deadline))
+        self.assertEqual(statuses[self.missing.id], ('missing', self.deadline))
+
+    def test_personal_extension_overrides_deadline(self):
+        extended_until = self.now + timedelta(days=1)
+        AssignmentDeadlineExtension.objects.create(assignment=self.assignment, user=self.extended,
+                                                   extended_submission_deadline=extended_until)
+        statuses = self.statuses()
+        self.assertEqual(statuses[self.extended.id], ('on_time', extended_until))
+        self.assertEqual(statuses[self.late.id], ('late', self.deadline))
+        self.assertEqual(get_effective_deadlines(self.assignment, [self.extended.id, self.late.id]),
+                         {self.extended.id: extended_until, self.late.id: self.deadline})
+
+    def test_class_extension_applies_unless_student_has_personal_one(self):
+        classwide = self.now
+        personal = self.now - timedelta(days=1, hours=12)
+        AssignmentDeadlineExtension.objects.create(assignment=self.assignment, user=None,
+                                                   extended_submission_deadline=classwide)
+        AssignmentDeadlineExtension.objects.create(assignment=self.assignment, user=self.extended,
+                                                   extended_submission_deadline=personal)
+        statuses = self.statuses()
+        self.assertEqual(statuses[self.late.id], ('on_time', classwide))
+        self.assertEqual(statuses[self.missing.id], ('missing', classwide))
+        # The personal extension wins even though it ends before the class-wide one
+        self.assertEqual(statuses[self.extended.id], ('late', personal))
+        self.assertEqual(get_effective_deadline(self.assignment, self.extended), personal)
+
+    def test_deadlines_endpoint(self):
+        response = self.client.get(f'/api/assignments/{self.assignment.id}/deadlines/')
+        self.assertEqual(response.status_code, 200)
+        by_user = {row['user']['id']: row['status'] for row in response.json()}
+        self.assertEqual(by_user, {self.on_time.id: 'on_time', self.late.id: 'late',
+                                   self.missing.id: 'missing', self.extended.id: 'late'})
+
+
+class RosterCsvTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher, cls.student, cls.course, _, _ = seed_submission()
+
+    def read(self, text):
+        return list(read_roster_csv(io.BytesIO(text.encode('utf-8'))))
+
+    def upload(self, text, **data):
+        body = encode_multipart(BOUNDARY, {'file': SimpleUploadedFile('roster.csv', text.encode('utf-8')), **data})
+        return self.client.patch(f'/api/classes/{self.course.id}/roster/', body, content_type=MULTIPART_CONTENT)
+
+    def test_header_row_selects_email_column(self):
+        text = '\ufeffName,Email\nAda, ada@union.edu \n,\nBob,\nCy,cy@union.edu\n'
+        self.assertEqual(self.read(text), ['ada@union.edu', 'cy@union.edu'])
+
+    def test_without_header_first_email_cell_is_used(self):
+        text = 'Ada,ada@union.edu,x@union.edu\n\nno email here\nbob@union.edu\n'
+        self.assertEqual(self.read(text), ['ada@union.edu', 'bob@union.edu'])
+
+    def test_upload_adds_students_once_and_reports_unknown_emails(self):
+        text = 'email\nstudent@union.edu\nnew@union.edu\n\nnew@union.edu\nstranger@example.com\n'
+        response = self.upload(text)
+        self.assertEqual(response.json(), {'status': 'partial', 'not_found': ['stranger@example.com']})
+        self.assertEqual(sorted(self.course.students.values_list('email', flat=True)),
+                         ['new@union.edu', 'student@union.edu'])
+        self.assertEqual(User.objects.filter(email='new@union.edu').count(), 1)
+
+    def test_upload_without_unknown_emails_returns_roster(self):
+        response = self.upload('student@union.edu\n')
+        self.assertEqual([u['email'] for u in response.json()], ['student@union.edu'])
+
+    def test_upload_sync_replaces_roster(self):
+        self.course.students.add(self.student)
+        response = self.upload('email\nnew@union.edu\n', action='sync')
+        self.assertEqual(response.json()['added'], ['new@union.edu'])
+        self.assertEqual(response.json()['removed'], ['student@union.edu'])
+        self.assertEqual(list(self.course.students.values_list('email', flat=True)), ['new@union.edu'])
+
+
+class AssignmentStatsTests(TestCase):
+
+    def setUp(self):
+        self.teacher, self.student, self.course, self.assignment, self.submission = seed_submission()
+        self.other = User.objects.create(email='other@union.edu', name='Other')
+
+    def comment(self, user, comment_type='general', submission=None):
+        return AssignmentSubmissionComment.objects.create(
+            submission=submission or self.submission, comment_type=comment_type, user=user,
+            start_line=1, end_line=1, start_offset=0, end_offset=0, comment='hi',
+        )
+
+    def assertStats(self, comments, commenters):
+        """Check the incremental counters, then that a full rebuild agrees with them."""
+        stats = get_assignment_stats(self.assignment.id)
+        per_user = dict(AssignmentCommenter.objects.filter(assignment=self.assignment).values_list('user_id', 'comment_count'))
+        self.assertEqual((stats['comment_count'], stats['commenter_count']), (comments, commenters))
+        rebuild_assignment_stats(self.assignment.id)
+        self.assertEqual(get_assignment_stats(self.assignment.id), stats)
+        self.assertEqual(
+            dict(AssignmentCommenter.objects.filter(assignment=self.assignment).values_list('user_id', 'comment_count')),
+            per_user,
+        )
+
+    def test_create(self):
+        self.comment(self.teacher)
+        self.assertStats(1, 1)
+
+    def test_second_comment_by_same_commenter(self):
+        self.comment(self.teacher)
+        self.comment(self.teacher)
+        self.comment(self.other)
+        self.assertStats(3, 2)
+
+    def test_deleting_last_comment_removes_commenter(self):
+        first = self.comment(self.teacher)
+        second = self.comment(self.teacher)
+        self.comment(self.other)
+        first.delete()
+        self.assertStats(2, 2)
+        second.delete()
+        self.assertStats(1, 1)
+
+    def test_submission_delete_cascades_to_counters(self):
+        self.comment(self.teacher)
+        self.comment(self.other)
+        other_submission = AssignmentSubmission.objects.create(assignment=self.assignment, user=self.other, is_current=True)
+        self.comment(self.teacher, submission=other_submission)
+        self.submission.delete()
+        self.assertStats(1, 1)
+        self.assertEqual(get_assignment_stats(self.assignment.id)['submission_count'], 1)
+
+    def test_linter_comments_are_not_counted(self):
+        linter = User.objects.create(email='linter@localhost', name='Linter')
+        self.comment(linter, comment_type='linter').delete()
+        self.comment(linter, comment_type='linter')
+        self.comment(self.teacher)
+        self.assertStats(1, 1)
+
+
+class CommentTreeTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher, cls.student, cls.course, cls.assignment, cls.submission = seed_submission()
+        cls.root = cls.comment()
+        cls.replies = [cls.comment(parent=cls.root) for _ in range(5)]
+        cls.nested = cls.comment(parent=cls.replies[0])
+        cls.url = f'/api/submit/{cls.submission.id}/comments/tree/'
+
+    @classmethod
+    def comment(cls, parent=None):
+        return AssignmentSubmissionComment.objects.create(
+            submission=cls.submission, comment_type='general', user=cls.teacher, parent=parent,
+            start_line=1, end_line=1, start_offset=0, end_offset=0, comment='hi',
+        )
+
+    def test_replies_are_trimmed_but_counted(self):
+        [thread] = self.client.get(self.url + '?replies=2').json()
+        self.assertEqual(thread['reply_count'], 5)
+        self.assertEqual([r['id'] for r in thread['replies']], [r.id for r in self.replies[:2]])
+
+    def test_reply_pages(self):
+        page = self.client.get(self.url + f'?parent={self.root.id}&offset=2&limit=2').json()
+        self.assertEqual([r['id'] for r in page], [r.id for r in self.replies[2:4]])
+        rest = self.client.get(self.url + f'?parent={self.root.id}&offset=4').json()
+        self.assertEqual([r['id'] for r in rest], [self.replies[4].id])
+        first = self.client.get(self.url + f'?parent={self.root.id}&limit=1').json()
+        self.assertEqual([(r['id'], r['reply_count']) for r in first], [(self.replies[0].id, 1)])
+        self.assertEqual(self.client.get(self.url + f'?parent={self.root.id}&offset=10').json(), [])
+
+    def test_negative_values_are_rejected(self):
+        for query in ('replies=-1', f'parent={self.root.id}&offset=-1', f'parent={self.root.id}&limit=-1'):
+            self.assertEqual(self.client.get(f'{self.url}?{query}').status_code, 400, query)
+
+    def test_missing_submission_is_not_found(self):
+        self.assertEqual(self.client.get(f'/api/submit/{self.submission.id + 1000}/comments/tree/').status_code, 404)
+
+
+class ConditionalRequestTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher, cls.student, cls.course, cls.assignment, cls.submission = seed_submission()
+
+    def revalidate(self, url):
+        """Fetch `url`, then fetch it again with its ETag and return (etag, second response)."""
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        etag = first.headers['ETag']
+        return etag, self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_responses_are_not_modified(self):
+        for url in [
+            f'/api/classes/{self.course.id}/assignments/',
+            f'/api/assignments/{self.assignment.id}/extensions/',
+            f'/api/submit/{self.submission.id}/',
+        ]:
+            _, response = self.revalidate(url)
+            self.assertEqual(response.status_code, 304, url)
+
+    def test_comment_changes_submission_etag(self):
+        url = f'/api/submit/{self.submission.id}/'
+        etag, response = self.revalidate(url)
+        self.assertIn('Last-Modified', response.headers)
+        AssignmentSubmissionComment.objects.create(
+            submission=self.submission, user=self.teacher, comment_type='general', comment='Nice',
+            start_line=1, end_line=1, start_offset=0, end_offset=0,
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_new_extension_changes_etag(self):
+        url = f'/api/assignments/{self.assignment.id}/extensions/'
+        etag, _ = self.revalidate(url)
+        AssignmentDeadlineExtension.objects.create(
+            assignment=self.assignment, user=self.student,
+            extended_submission_deadline=self.assignment.submission_deadline + timedelta(days=2),
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+
+    def test_deleted_extension_is_not_answered_with_stale_304(self):
+        url = f'/api/assignments/{self.assignment.id}/extensions/'
+        deadline = self.assignment.submission_deadline + timedelta(days=1)
+        AssignmentDeadlineExtension.objects.create(assignment=self.assignment, user=None, extended_submission_deadline=deadline)
+        AssignmentDeadlineExtension.objects.create(assignment=self.assignment, user=self.student, extended_submission_deadline=deadline)
+        first = self.client.get(url)
+        # A delete doesn't move Max(updated_at), so lists only get an ETag
+        self.assertNotIn('Last-Modified', first.headers)
+        self.client.delete(url, {'students': [self.student.id]}, content_type='application/json')
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual((response.status_code, len(response.json())), (200, 1))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first.headers['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_query_string(self):
+        url = f'/api/classes/{self.course.id}/assignments/'
+        etag, _ = self.revalidate(url)
+        response = self.client.get(url + '?page_size=10', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+@override_settings(COMMENT_STREAM_TIMEOUT=0.05, COMMENT_STREAM_POLL_INTERVAL=0.01)
+class CommentEventTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher, cls.student, cls.course, cls.assignment, cls.submission = seed_submission()
+
+    def add_comment(self, text='Nice'):
+        return AssignmentSubmissionComment.objects.create(
+            submission=self.submission, user=self.teacher, comment_type='general', comment=text,
+            start_line=1, end_line=1, start_offset=0, end_offset=0,
+        )
+
+    def read_stream(self, response):
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return b''.join(response.streaming_content).decode()
+
+    def test_comment_changes_are_recorded(self):
+        comment = self.add_comment()
+        comment.comment = 'Edited'
+        comment.save()
+        comment_id = comment.id
+        comment.delete()
+        events = list(CommentEvent.objects.filter(submission_id=self.submission.id).order_by('id'))
+        self.assertEqual([e.action for e in events], ['create', 'update', 'delete'])
+        self.assertEqual(events[0].payload['user_name'], 'Teacher')
+        self.assertEqual(events[1].payload['comment'], 'Edited')
+        self.assertEqual(events[2].payload, {'id': comment_id, 'parent': None})
+
+    def test_stream_resumes_after_last_event_id(self):
+        first = self.add_comment('first')
+        seen = CommentEvent.objects.get(comment_id=first.id).id
+        second = self.add_comment('second')
+        url = f'/api/submit/{self.submission.id}/events/'
+        body = self.read_stream(self.client.get(url, HTTP_LAST_EVENT_ID=str(seen)))
+        self.assertTrue(body.startswith('retry: '))
+        self.assertNotIn('"comment":"first"', body)
+        self.assertIn(f'event: create\ndata: {{"id":{second.id},', body)
+
+    def test_stream_without_last_event_id_only_sends_new_events(self):
+        self.add_comment('old')
+        body = self.read_stream(self.client.get(f'/api/submit/{self.submission.id}/events/'))
+        self.assertNotIn('event:', body)
+
+    async def test_asgi_stream(self):
+        comment = await sync_to_async(self.add_comment)()
+        response = await self.async_client.get(
+            f'/api/submit/{self.submission.id}/events/', headers={'Last-Event-ID': '0'},
+        )
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertIn(f'"id":{comment.id}', body)
+
+    def test_stream_for_missing_submission(self):
+        self.assertEqual(self.client.get('/api/submit/999999/events/').status_code, 404)
+
+
+class AsyncReadViewTests(TestCase):
+    """The async views served under ASGI must answer exactly like the DRF views."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher, cls.student, cls.course, cls.assignment, cls.submission = seed_submission()
+        cls.course.students.add(cls.student)
+        AssignmentSubmissionComment.objects.create(
+            submission=cls.submission, user=cls.teacher, comment_type='general', comment='Nice',
+            start_line=1, end_line=1, start_offset=0, end_offset=0,
+        )
+
+    async def get_both(self, url, **headers):
+        """GET a URL through the WSGI URLs and through the ASGI URLs with the async client."""
+        expected = await sync_to_async(self.client.get)(url, headers=headers)
+        with override_settings(ROOT_URLCONF='backend.asgi_urls'):
+            response = await self.async_client.get(url, headers=headers)
+        return expected, response
+
+    async def test_async_views_match_drf_views(self):
+        for url in [
+            f'/api/classes/?teacher={self.teacher.id}',
+            f'/api/classes/?student={self.student.id}',
+            f'/api/classes/{self.course.id}/assignments/',
+            f'/api/classes/{self.course.id}/roster/',
+            f'/api/submit/{self.submission.id}/',
+            f'/api/classes/{self.course.id}/roster/?page_size=10',
+        ]:
+            expected, response = await self.get_both(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertEqual(response.json(), expected.json(), url)
+
+    async def test_async_views_send_validators(self):
+        url = f'/api/submit/{self.submission.id}/'
+        expected, response = await self.get_both(url)
+        self.assertEqual(response.headers['ETag'], expected.headers['ETag'])
+        _, response = await self.get_both(url, if_none_match=expected.headers['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    async def test_missing_submission(self):
+        expected, response = await self.get_both('/api/submit/999999/')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), expected.json())
+
+    @override_settings(ROOT_URLCONF='backend.asgi_urls')
+    async def test_writes_fall_back_to_drf_views(self):
+        response = await self.async_client.patch(
+            f'/api/classes/{self.course.id}/roster/', {'student': 'new@union.edu'}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('new@union.edu', [u['email'] for u in response.json()])
+
+
+class RequestTimingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher, cls.student, cls.course, cls.assignment, cls.submission = seed_submission()
+        cls.course.students.add(cls.student)
+
+    def server_timing(self, response):
+        metrics = {}
+        for entry in response.headers['Server-Timing'].split(', '):
+            name, *params = entry.split(';')
+            metrics[name] = dict(p.split('=', 1) for p in params)
+        return metrics
+
+    def test_server_timing_header(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/api/classes/{self.course.id}/roster/')
+        metrics = self.server_timing(response)
+        self.assertEqual(set(metrics), {'db', 'serialize', 'app', 'render', 'total'})
+        self.assertEqual(metrics['db']['desc'], f'"{len(ctx.captured_queries)} queries"')
+        self.assertGreaterEqual(float(metrics['total']['dur']), float(metrics['render']['dur']))
+
+    def test_serialization_is_timed_apart_from_the_view(self):
+        to_representation = UserSerializer.to_representation
+
+        def slow(serializer, instance):
+            time.sleep(0.05)
+            return to_representation(serializer, instance)
+
+        with mock.patch.object(UserSerializer, 'to_representation', slow):
+            response = self.client.get(f'/api/classes/{self.course.id}/roster/')
+        metrics = self.server_timing(response)
+        self.assertGreaterEqual(float(metrics['serialize']['dur']), 50)
+        self.assertLess(float(metrics['app']['dur']), 50)
+
+    @override_settings(SLOW_REQUEST_MS=0)
+    def test_slow_requests_are_logged_with_repeated_queries(self):
+        with self.assertLogs('api.slow_requests', 'WARNING') as logs:
+            self.client.get(f'/api/submit/{self.submission.id}/')
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['path'], f'/api/submit/{self.submission.id}/')
+        self.assertEqual(entry['status'], 200)
+        self.assertEqual(entry['queries'], sum(q['count'] for q in entry['top_queries']))
+
+    @override_settings(ROOT_URLCONF='backend.asgi_urls')
+    async def test_async_views_are_timed(self):
+        response = await self.async_client.get(f'/api/classes/{self.course.id}/roster/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server_timing(response)['db']['desc'], '"2 queries"')
+
+
+class ProfilingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher, cls.student, cls.course, cls.assignment, cls.submission = seed_submission()
+
+    def setUp(self):
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir)
+        self.settings_override = override_settings(PROFILING_DIR=self.profile_dir, PROFILING_TOKEN='secret')
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.url = f'/api/assignments/{self.assignment.id}/submissions/'
+
+    def test_unauthorized_requests_are_not_profiled(self):
+        for response in (self.client.get(self.url, headers={'X-Profile': 'wrong'}),
+                         self.client.get(self.url + '?profile=1')):
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('X-Profile-Id', response.headers)
+        self.assertEqual(os.listdir(self.profile_dir), [])
+
+    def test_token_profiles_request_and_command_summarizes_it(self):
+        plain = self.client.get(self.url)
+        response = self.client.get(self.url, headers={'X-Profile': 'secret'})
+        self.assertEqual(response.json(), plain.json())
+        profile_id = response.headers['X-Profile-Id']
+        self.assertEqual(sorted(os.listdir(self.profile_dir)), [f'{profile_id}.json', f'{profile_id}.prof'])
+        with open(os.path.join(self.profile_dir, f'{profile_id}.json')) as f:
+            profile = json.load(f)
+        self.assertEqual((profile['path'], profile['status']), (self.url, 200))
+        self.assertTrue(profile['top_allocations'])
+
+        out = io.StringIO()
+        call_command('profiles', stdout=out)
+        self.assertIn(profile_id, out.getvalue())
+        out = io.StringIO()
+        call_command('profiles', profile_id, '--limit', '5', stdout=out)
+        self.assertIn('function calls', out.getvalue())
+        self.assertIn('Top allocation sites:', out.getvalue())
+
+    def test_staff_users_may_profile_with_query_parameter(self):
+        self.client.force_login(AuthUser.objects.create(username='admin', is_staff=True))
+        response = self.client.get(self.url + '?profile=1')
+        self.assertIn('X-Profile-Id', response.headers)
+
+
+class SubmissionDiffTests(TestCase):
+
+    OLD = ''.join(f'line {n}\n' for n in range(1, 21))
+
+    def setUp(self):
+        blob_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, blob_root)
+        self.settings_override = override_settings(SUBMISSION_BLOB_ROOT=blob_root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.teacher, self.student, self.course, self.assignment, _ = seed_submission()
+        self.old = create_submission(self.assignment, self.student, [
+            ('main.py', self.OLD), ('util.py', 'a\n'), ('same.py', 'same\n'),
+        ])
+        lines = self.OLD.splitlines(keepends=True)
+        # Line 5 edited, a line inserted after line 10, lines 15-16 removed
+        new = lines[:4] + ['line five\n'] + lines[5:10] + ['inserted\n'] + lines[10:14] + lines[16:]
+        self.new = create_submission(self.assignment, self.student, [
+            ('main.py', ''.join(new)), ('same.py', 'same\n'), ('added.py', 'b\nc\n'),
+        ])
+
+    def comment(self, submission, name, start, end, parent=None):
+        return AssignmentSubmissionComment.objects.create(
+            submission=submission, submission_file=submission.files.get(name=name), comment_type='file',
+            user=self.teacher, start_line=start, end_line=end, start_offset=0, end_offset=1, comment='?', parent=parent,
+        )
+
+    def test_remap_range(self):
+        ops = get_opcodes([(self.old.files.get(name='main.py').content_hash,
+                            self.new.files.get(name='main.py').content_hash)]).popitem()[1]
+        self.assertEqual(remap_range(ops, 2, 3), (2, 3, 'exact'))
+        self.assertEqual(remap_range(ops, 5, 5), (5, 5, 'changed'))
+        self.assertEqual(remap_range(ops, 12, 13), (13, 14, 'exact'))
+        self.assertEqual(remap_range(ops, 10, 11), (10, 12, 'changed'))
+        self.assertEqual(remap_range(ops, 15, 16), (None, None, 'deleted'))
+        self.assertEqual(remap_range(ops, 14, 17), (15, 16, 'changed'))
+
+    def test_diff_against_previous_version(self):
+        self.comment(self.old, 'main.py', 12, 12)
+        self.comment(self.old, 'util.py', 1, 1)
+        response = self.client.get(f'/api/submit/{self.new.id}/diff/?context=1')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['against'], self.old.id)
+        files = {f['name']: f for f in data['files']}
+        self.assertEqual({name: f['status'] for name, f in files.items()}, {
+            'added.py': 'added', 'main.py': 'modified', 'same.py': 'unchanged', 'util.py': 'removed',
+        })
+        main = files['main.py']
+        self.assertEqual((main['added'], main['removed']), (2, 3))
+        self.assertEqual([(h['old_start'], h['old_count'], h['new_start'], h['new_count']) for h in main['hunks']],
+                         [(4, 3, 4, 3), (10, 2, 10, 3), (14, 4, 15, 2)])
+        self.assertEqual([(line['type'], line['text']) for line in main['hunks'][0]['lines']],
+                         [(' ', 'line 4'), ('-', 'line 5'), ('+', 'line five'), (' ', 'line 6')])
+        self.assertEqual([(c['new_start_line'], c['status']) for c in data['comments']], [(13, 'exact'), (None, 'deleted')])
+
+    def test_diffs_are_cached_by_content_hash_pair(self):
+        self.client.get(f'/api/submit/{self.new.id}/diff/')
+        self.assertEqual(FileDiff.objects.count(), 1)
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(f'/api/submit/{self.new.id}/diff/')
+        self.assertFalse([q for q in ctx.captured_queries if 'INSERT' in q['sql']])
+        self.assertEqual(FileDiff.objects.count(), 1)
+
+    def test_move_comments_onto_new_version(self):
+        moved = self.comment(self.old, 'main.py', 12, 13)
+        reply = self.comment(self.old, 'main.py', 12, 13, parent=moved)
+        lost = self.comment(self.old, 'main.py', 15, 16)
+        lost_reply = self.comment(self.old, 'main.py', 15, 16, parent=lost)
+        nested_reply = self.comment(self.old, 'main.py', 15, 16, parent=lost_reply)
+        response = self.client.post(f'/api/submit/{self.new.id}/comments/remap/', {'against': self.old.id},
+                                    content_type='application/json')
+        self.assertEqual(response.json()['moved'], [moved.id, reply.id])
+        self.assertEqual(response.json()['left'], [lost.id, lost_reply.id, nested_reply.id])
+        for comment in (moved, reply):
+            comment.refresh_from_db()
+            self.assertEqual((comment.submission_id, comment.start_line, comment.end_line), (self.new.id, 13, 14))
+            self.assertEqual(comment.submission_file.name, 'main.py')
+        for comment in (lost, lost_reply, nested_reply):
+            self.assertEqual(AssignmentSubmissionComment.objects.get(id=comment.id).submission_id, self.old.id)
+        self.assertEqual(CommentEvent.objects.filter(submission_id=self.new.id, action='create').count(), 2)
+
+    def test_comments_only_move_to_a_later_version(self):
+        kept = self.comment(self.new, 'main.py', 1, 1)
+        response = self.client.post(f'/api/submit/{self.old.id}/comments/remap/', {'against': self.new.id},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(AssignmentSubmissionComment.objects.get(id=kept.id).submission_id, self.new.id)
+
+    def test_only_versions_of_same_submission_can_be_diffed(self):
+        other = User.objects.create(email='other@union.edu', name='Other')
+        theirs = create_submission(self.assignment, other, [('main.py', self.OLD)])
+        response = self.client.get(f'/api/submit/{self.new.id}/diff/?against={theirs.id}')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(f'/api/submit/{theirs.id}/diff/')
+        self.assertEqual(response.status_code, 404)
+
+
+class SQLiteTuningTests(TestCase):
+
+    # Only PRAGMAs that may change inside the test transaction can be checked here
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -1234, 'busy_timeout': 4321})
+    def test_pragmas_applied_on_connect(self):
+        configure_connection(sender=connection.__class__, connection=connection)
+        with connection.cursor() as cursor:
+            self.assertEqual(cursor.execute('PRAGMA cache_size').fetchone()[0], -1234)
+            self.assertEqual(cursor.execute('PRAGMA busy_timeout').fetchone()[0], 4321)
+
+    def production_database(self, asgi):
+        env = {'DJANGO_SECRET_KEY': 'test'}
+        if asgi:
+            env['DJANGO_ASGI'] = '1'
+        with mock.patch.dict(os.environ, env):
+            if not asgi:
+                os.environ.pop('DJANGO_ASGI', None)
+            sys.modules.pop('backend.settings_production', None)
+            try:
+                return importlib.import_module('backend.settings_production').DATABASES['default']
+            finally:
+                sys.modules.pop('backend.settings_production', None)
+
+    def test_persistent_connections_only_under_wsgi(self):
+        self.assertEqual(self.production_database(asgi=False)['CONN_MAX_AGE'], 600)
+        self.assertEqual(self.production_database(asgi=True)['CONN_MAX_AGE'], 0)
+
+
+LINT_ROOT = tempfile.mkdtemp(prefix='api-tests-lint-')
+
+
+@override_settings(
+    SUBMISSION_BLOB_ROOT=LINT_ROOT,
+    SUBMISSION_LINTERS={'.py': {'fake': ['python', '-c', 'import sys; print(sys.argv[1] + ":2:5: looks odd")']}},
+    LINT_WORKERS=1,
+)
+class LintingTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(LINT_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        now = timezone.now()
+        self.user = User.objects.create(name='Student', email='student@union.edu')
+        teacher = User.objects.create(name='Teacher', email='teacher@union.edu', is_teacher=True)
+        course = Class.objects.create(code='C', name='n', term='F', year=2025,
+                                      start_date=now.date(), end_date=now.date(), teacher=teacher)
+        self.assignment = Assignment.objects.create(course=course, name='a', description='', release_date=now,
+                                                    submission_deadline=now, commenting_deadline=now)
+
+    def test_parse_findings(self):
+        output = "/b/ab:3:7: E225 missing whitespace\n/b/ab:9: undefined name 'x'\n/b/other:1:1: nope\n"
+        self.assertEqual(parse_findings(output, '/b/ab'), [
+            {'line': 3, 'column': 7, 'message': 'E225 missing whitespace'},
+            {'line': 9, 'column': 0, 'message': "undefined name 'x'"},
+        ])
+
+    def test_findings_become_linter_comments_and_are_cached(self):
+        files = [('main.py', 'x = 1\ny = 2\n'), ('README.md', '# hi\n')]
+        first = create_submission(self.assignment, self.user, files)
+        self.assertEqual(lint_files(first.files.all()), 1)
+        comment = AssignmentSubmissionComment.objects.get(comment_type='linter')
+        self.assertEqual((comment.start_line, comment.start_offset, comment.comment), (2, 4, 'fake: looks odd'))
+        self.assertFalse(first.files.filter(linted=False).exists())
+
+        # An unchanged resubmission reuses the cached result instead of running the linter
+        second = create_submission(self.assignment, self.user, files)
+        with override_settings(SUBMISSION_LINTERS={'.py': {'fake': ['false']}}):
+            call_command('lint_submissions', stdout=io.StringIO())
+        self.assertEqual(second.comments.filter(comment_type='linter').count(), 1)
+        self.assertEqual(LintResult.objects.count(), 1)
+
+    def test_linter_user_is_hidden_from_user_listings(self):
+        linter = get_linter_user()
+        self.assertTrue(linter.is_system)
+        emails = [u['email'] for u in self.client.get('/api/users/').json()]
+        self.assertNotIn(linter.email, emails)
+        self.assertIn(self.user.email, emails)
+        self.assertEqual(self.client.get(f'/api/users/?email={linter.email}').status_code, 404)
+        # Comments carry their author's name, since the linter can't be looked up in /api/users/
+        submission = create_submission(self.assignment, self.user, [('main.py', 'x = 1\ny = 2\n')])
+        lint_files(submission.files.all())
+        comments = self.client.get(f'/api/submit/{submission.id}/').json()['comments']
+        self.assertEqual([(c['comment_type'], c['user_name']) for c in comments], [('linter', linter.name)])
+        course = self.assignment.course
+        response = self.client.patch(f'/api/classes/{course.id}/roster/', {'students': [linter.email]},
+                                     content_type='application/json')
+        self.assertEqual(response.json()['not_found'], [linter.email])
+        self.assertFalse(course.students.filter(id=linter.id).exists())
+
+    def test_new_submission_is_linted_by_worker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            submission = create_submission(self.assignment, self.user, [('main.py', 'x = 1\ny = 2\n')])
+        self.assertEqual(Task.objects.get().name, 'api.tasks.lint_submission')
+        self.assertTrue(run_next('test-worker'))
+        self.assertEqual(submission.comments.filter(comment_type='linter').count(), 1)
+
+    def test_failed_linter_leaves_file_pending(self):
+        submission = create_submission(self.assignment, self.user, [('main.py', 'x = 1\n')])
+        with override_settings(SUBMISSION_LINTERS={'.py': {'broken': ['false']}}):
+            self.assertEqual(lint_files(submission.files.all()), 0)
+        self.assertTrue(submission.files.filter(linted=False).exists())
+        self.assertFalse(LintResult.objects.exists())
+
+
+calls = []
+
+
+@task(name='tests.record', max_attempts=2)
+def record(value):
+    if value == 'fail':
+        raise RuntimeError('boom')
+    calls.append(value)
+
+
+@override_settings(TASK_RETRY_BACKOFF=0)
+class TaskQueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_enqueue_waits_for_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            record.enqueue('a')
+            self.assertFalse(Task.objects.exists())
+        self.assertEqual(Task.objects.get().args, ['a'])
+
+    def test_jobs_run_by_priority(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            record.enqueue('low')
+            record.enqueue('high', priority=5)
+        while run_next('test-worker'):
+            pass
+        self.assertEqual(calls, ['high', 'low'])
+        self.assertEqual(set(Task.objects.values_list('status', flat=True)), {Task.DONE})
+
+    def test_claimed_job_is_not_claimed_again(self):
+        Task.objects.create(name='tests.record', args=['x'])
+        self.assertIsNotNone(claim_task('worker-1'))
+        self.assertIsNone(claim_task('worker-2'))
+
+    def test_failed_job_is_retried_then_marked_failed(self):
+        job = Task.objects.create(name='tests.record', args=['fail'], max_attempts=2)
+        with self.assertLogs('api.taskqueue', 'ERROR'):
+            self.assertTrue(run_next('test-worker'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Task.QUEUED, 1))
+        with self.assertLogs('api.taskqueue', 'ERROR'):
+            self.assertTrue(run_next('test-worker'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Task.FAILED, 2))
+        self.assertIn('RuntimeError: boom', job.last_error)
+
+    def expire_lock(self, job):
+        Task.objects.filter(id=job.id).update(locked_at=timezone.now() - timedelta(seconds=settings.TASK_LOCK_TIMEOUT + 1))
+
+    def test_job_that_kills_its_worker_is_failed_after_max_attempts(self):
+        job = Task.objects.create(name='tests.record', args=['x'], max_attempts=2)
+        self.assertEqual(claim_task('worker-1').attempts, 1)
+        self.expire_lock(job)
+        self.assertEqual(claim_task('worker-2').attempts, 2)
+        self.expire_lock(job)
+        with self.assertLogs('api.taskqueue', 'ERROR'):
+            self.assertIsNone(claim_task('worker-3'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.locked_by), (Task.FAILED, 2, ''))
+
+    def test_reclaimed_job_keeps_new_owners_state(self):
+        job = Task.objects.create(name='tests.record', args=['slow'])
+        first = claim_task('worker-1')
+        self.expire_lock(job)
+        second = claim_task('worker-2')
+        with self.assertLogs('api.taskqueue', 'WARNING'):
+            self.assertFalse(run_task(first))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), (Task.RUNNING, 'worker-2'))
+        self.assertTrue(run_task(second))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), (Task.DONE, ''))
+
+    def test_worker_command_runs_queue_until_empty(self):
+        Task.objects.create(name='tests.record', args=['cmd'])
+        call_command('worker', '--burst', stdout=io.StringIO())
+        self.assertEqual(calls, ['cmd'])
@@ -2,19 +2,37 @@
 from rest_framework import viewsets, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from django.http import HttpResponseNotFound
+from django.http import HttpResponseNotFound, HttpResponseBadRequest, FileResponse, StreamingHttpResponse
 from django.http import QueryDict
+from django.core.handlers.asgi import ASGIRequest
+from django.views.decorators.http import require_GET
 from .serializers import UserSerializer, ClassSerializer
 from .serializers import ClassRosterSerializer
 from .serializers import AssignmentSerializer, AssignmentGroupSerializer
 from .serializers import SubmissionSerializer, CommentSerializer, SubmissionFileSerializer, AssignmentDeadlineExtensionSerializer
+from .serializers import StudentDeadlineSerializer, GroupStatusSerializer, SubmissionUploadSerializer
+from .serializers import SubmissionArchiveUploadSerializer
 from .models import User, Class, Assignment, AssignmentGroup, AssignmentSubmission, AssignmentSubmissionComment, AssignmentSubmissionFile
 from .models import AssignmentDeadlineExtension
-from .utils import should_restrict_submission_access
+from .utils import should_restrict_submission_access, get_submission_statuses, get_group_statuses
+from .blobstore import open_blob
+from .roster import read_roster_csv, add_students, sync_roster
+from .diffs import DEFAULT_CONTEXT as DEFAULT_DIFF_CONTEXT, diff_submissions, move_comments, previous_version
+from .groups import STRATEGIES as GROUP_STRATEGIES, enrolled_students, grouped_students, members_from_emails
+from .groups import split_into_groups, create_groups
+from .pagination import PaginatedListMixin
+from .stats import get_assignment_stats, rebuild_assignment_stats
+from .comments import get_comment_tree, get_reply_page, get_comments_in_window
+from .submissions import create_submission, store_files, save_submission
+from .archives import iter_archive_files, ArchiveError
+from .export import iter_assignment_zip, stream_assignment_zip
+from .tasks import lint_submission_file
+from .conditional import conditional, class_assignments_version, extensions_version, submission_version
+from .events import latest_event_id, stream_comment_events, iter_comment_events
 
 # Create your views here.
 
-class UserView(viewsets.ModelViewSet):
+class UserView(PaginatedListMixin, viewsets.ModelViewSet):
     serializer_class = UserSerializer
     queryset = User.objects.all()
 
@@ -22,18 +40,17 @@ class UserView(viewsets.ModelViewSet):
         email = request.GET.get('email', None)
         if email is not None:
             try:
-                user = User.objects.get(email=email)
+                user = User.objects.people().get(email=email)
                 serializer = UserSerializer(user)
                 return Response(serializer.data)
             except User.DoesNotExist:
                 return HttpResponseNotFound(f"User not found")
         else:
-            users = User.objects.all()
-            serializer = UserSerializer(users, many=True)
-            return Response(serializer.data)
+            users = User.objects.people()
+            return self.list_response(users, UserSerializer)
 
 
-class ClassView(viewsets.ModelViewSet):
+class ClassView(PaginatedListMixin, viewsets.ModelViewSet):
     serializer_class = ClassSerializer
     queryset = Class.objects.all()
 
@@ -43,22 +60,21 @@ class ClassView(viewsets.ModelViewSet):
         if teacher is not None:
             # list classes for given teacher: /api/classes?teacher=<id>
             queryset = self.queryset.filter(teacher__id=teacher)
-            serializer = ClassSerializer(queryset, many=True)
-            return Response(serializer.data)
+            return self.list_response(queryset, ClassSerializer)
         elif student is not None:
             # list classes for given student: /api/classes?student=<id>
             queryset = self.queryset.filter(students__id=student)
-            serializer = ClassSerializer(queryset, many=True)
-            return Response(serializer.data)
+            return self.list_response(queryset, ClassSerializer)
         else:
             return HttpResponseNotFound(f"Class(es) not found")
 
     @action(detail=True)
+    @conditional(class_assignments_version)
     def assignments(self, request, pk=None):
         # list assignments for given class: /api/classes/<id>/assignments
+        # answers 304 to If-None-Match / If-Modified-Since when nothing changed
         queryset = Assignment.objects.filter(course__id=pk)
-        serializer = AssignmentSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return self.list_response(queryset, AssignmentSerializer)
 
     # new fall 2025
     @action(detail=True, methods=['get', 'patch'])
@@ -67,8 +83,7 @@ class ClassView(viewsets.ModelViewSet):
             # list students for given class: /api/classes/<id>/roster
             class_object = Class.objects.get(id=pk)
             queryset = class_object.students.all()
-            serializer = UserSerializer(queryset, many=True)
-            return Response(serializer.data)
+            return self.list_response(queryset, UserSerializer)
         elif request.method == 'PATCH':
             class_object = Class.objects.get(id=pk)
             if "student" in request.data and "action" in request.data and request.data.get("action") == "remove":
@@ -86,7 +101,7 @@ class ClassView(viewsets.ModelViewSet):
                 student_email = request.data.get('student', None)
                 if student_email is not None:
                     try:
-                        student = User.objects.get(email=student_email)
+                        student = User.objects.people().get(email=student_email)
                     except User.DoesNotExist:
                         if student_email.endswith("@union.edu"):
                             User.objects.create(email=student_email, name=student_email.split('@')[0].capitalize(), is_teacher=False)
@@ -95,23 +110,21 @@ class ClassView(viewsets.ModelViewSet):
                             return HttpResponseNotFound(f"Not an acceptable email address: {student_email}")
                     class_object.students.add(student)
                     class_object.save()
-            elif "students" in request.data:
-                # PATCH: add multiple students to class roster: /api/classes/<id>/roster
-                student_emails = request.data.get('students', None)
-                if student_emails is not None and isinstance(student_emails, list):
-                    not_found = []
-                    for email in student_emails:
-                        try:
-                            student = User.objects.get(email=email)
-                        except User.DoesNotExist:
-                            if email.endswith("@union.edu"):
-                                User.objects.create(email=email, name=email.split('@')[0].capitalize(), is_teacher=False)
-                                student = User.objects.get(email=email)
-                            else:
-                                not_found.append(email)
-                                continue
-                        class_object.students.add(student)
-                    class_object.save()
+            elif "students" in request.data or "file" in request.FILES:
+                # PATCH: add multiple students to class roster, as { students: [email,...] } or a multipart CSV "file": /api/classes/<id>/roster
+                # with action "sync" the roster is replaced by exactly these students
+                if "file" in request.FILES:
+                    student_emails = read_roster_csv(request.FILES["file"])
+                else:
+                    student_emails = request.data.get('students', None)
+                    if not isinstance(student_emails, list):
+                        student_emails = None
+                if student_emails is not None:
+                    if request.data.get("action") == "sync":
+                        result = sync_roster(class_object, student_emails)
+                        result["status"] = "partial" if result["not_found"] else "synced"
+                        return Response(result)
+                    not_found = add_students(class_object, student_emails)
                     if len(not_found) > 0:
                         return Response({"status": "partial", "not_found": not_found})
             queryset = class_object.students.all()
@@ -119,7 +132,7 @@ class ClassView(viewsets.ModelViewSet):
             return Response(serializer.data)
 
 
-class AssignmentView(viewsets.ModelViewSet):
+class AssignmentView(PaginatedListMixin, viewsets.ModelViewSet):
     serializer_class = AssignmentSerializer
     queryset = Assignment.objects.all()
 
@@ -129,43 +142,75 @@ class AssignmentView(viewsets.ModelViewSet):
             student = request.GET.get('student', None)
             # list groups for given assignment: /api/assignments/<id>/groups
             if student is not None:
-                queryset = AssignmentGroup.objects.filter(assignment__id=pk)
+                queryset = AssignmentGroup.objects.filter(assignment__id=pk).prefetch_related('users')
                 queryset = queryset.filter(users__in=[student])
-                serializer = AssignmentGroupSerializer(queryset, many=True)
-                return Response(serializer.data)
+                return self.list_response(queryset, AssignmentGroupSerializer)
             else:
-                queryset = AssignmentGroup.objects.filter(assignment__id=pk)
-                serializer = AssignmentGroupSerializer(queryset, many=True)
-                return Response(serializer.data)
+                queryset = AssignmentGroup.objects.filter(assignment__id=pk).prefetch_related('users')
+                return self.list_response(queryset, AssignmentGroupSerializer)
         elif request.method == 'POST':  # new fall 2025
             # create new group for given assignment: /api/assignments/<id>/groups
             assignment = Assignment.objects.get(id=pk)
-            course = Class.objects.get(id=assignment.course.id)
             group = AssignmentGroup.objects.create(assignment=assignment)
-            print("REQUEST:", request.data)
             student_emails = request.data.get('students', None)
             if student_emails is not None and isinstance(student_emails, list):
-                users = []
-                for email in student_emails:
-                    try:
-                        user = User.objects.get(email=email)
-                        if user in course.students.all():
-                            users.append(user)
-                    except User.DoesNotExist:
-                        continue
-                group.users.set(users)
-            group.save()
-            queryset = AssignmentGroup.objects.filter(assignment__id=pk)
+                # One roster query instead of one per student; entries that aren't enrolled emails are ignored
+                members, _, _ = members_from_emails([student_emails], enrolled_students(assignment.course_id))
+                group.users.set(members[0])
+            queryset = AssignmentGroup.objects.filter(assignment__id=pk).prefetch_related('users')
             serializer = AssignmentGroupSerializer(queryset, many=True)
             return Response(serializer.data)
 
+    @action(detail=True, methods=['post'], url_path='groups/bulk')
+    def groups_bulk(self, request, pk=None):
+        # create many groups at once: /api/assignments/<id>/groups/bulk
+        # with { groups: [[email,...],...] } for explicit groups, or { size: k, strategy: "random"|"balanced", seed: n }
+        # to split the students not yet in a group; "replace": true deletes the existing groups first
+        try:
+            assignment = Assignment.objects.get(id=pk)
+        except Assignment.DoesNotExist:
+            return HttpResponseNotFound("Assignment not found")
+        replace = bool(request.data.get('replace', False))
+        explicit = request.data.get('groups', None)
+        size = request.data.get('size', None)
+        strategy = request.data.get('strategy', 'random')
+        seed = request.data.get('seed', None)
+
+        if explicit is not None:
+            if not isinstance(explicit, list) or not all(isinstance(g, list) for g in explicit):
+                return Response({'error': 'groups must be a list of lists of emails'}, status=400)
+        elif not isinstance(size, int) or isinstance(size, bool) or size < 1:
+            return Response({'error': 'groups or a positive integer size required'}, status=400)
+        elif strategy not in GROUP_STRATEGIES:
+            return Response({'error': f'strategy must be one of {", ".join(GROUP_STRATEGIES)}'}, status=400)
+        elif seed is not None and (not isinstance(seed, int) or isinstance(seed, bool)):
+            return Response({'error': 'seed must be an integer'}, status=400)
+
+        enrolled = enrolled_students(assignment.course_id)
+        already_grouped = set() if replace else grouped_students(assignment.id)
+        not_enrolled, duplicates = [], []
+        if explicit is not None:
+            members, not_enrolled, duplicates = members_from_emails(explicit, enrolled, already_grouped)
+        else:
+            available = sorted(set(enrolled.values()) - already_grouped)
+            members = split_into_groups(available, size, strategy, seed)
+        groups = create_groups(assignment.id, members, replace=replace)
+
+        queryset = AssignmentGroup.objects.filter(id__in=[g.id for g in groups]).prefetch_related('users')
+        return Response({
+            'groups': AssignmentGroupSerializer(queryset, many=True).data,
+            'not_enrolled': not_enrolled,
+            'already_grouped': duplicates,
+        }, status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=['get', 'post', 'delete'])
+    @conditional(extensions_version)
     def extensions(self, request, pk=None):
         if request.method == 'GET':
             # list extensions for assignment: api/assignments/<id>/extensions
-            queryset = AssignmentDeadlineExtension.objects.filter(assignment__id=pk)
-            serializer = AssignmentDeadlineExtensionSerializer(queryset, many=True)
-            return Response(serializer.data)
+            # answers 304 to If-None-Match / If-Modified-Since when nothing changed
+            queryset = AssignmentDeadlineExtension.objects.filter(assignment__id=pk).select_related('user')
+            return self.list_response(queryset, AssignmentDeadlineExtensionSerializer)
 
         if request.method == 'POST':
             # create or update extensions with { extended_deadline: ISOString, students: [id,...] } (individual students) or { extended_deadline: ISOString, all: true } (whole class): api/assignments/<id>/extensions
@@ -214,6 +259,52 @@ class AssignmentView(viewsets.ModelViewSet):
                 AssignmentDeadlineExtension.objects.filter(assignment__id=pk, user__id__in=students).delete()
             return Response({'status': 'deleted'})
 
+    @action(detail=True)
+    def deadlines(self, request, pk=None):
+        # effective deadline and on_time/late/missing status per student: /api/assignments/<id>/deadlines
+        try:
+            assignment = Assignment.objects.select_related('course').get(id=pk)
+        except Assignment.DoesNotExist:
+            return HttpResponseNotFound("Assignment not found")
+        statuses = get_submission_statuses(assignment)
+        serializer = StudentDeadlineSerializer(statuses, many=True)
+        return Response(serializer.data)
+
+    @action(detail=True)
+    def status(self, request, pk=None):
+        # groups with members, current submission metadata and extension status: /api/assignments/<id>/status
+        try:
+            assignment = Assignment.objects.get(id=pk)
+        except Assignment.DoesNotExist:
+            return HttpResponseNotFound("Assignment not found")
+        groups = get_group_statuses(assignment)
+        serializer = GroupStatusSerializer(groups, many=True)
+        return Response(serializer.data)
+
+    @action(detail=True)
+    def stats(self, request, pk=None):
+        # submission, comment and commenter counts: /api/assignments/<id>/stats (?recount=true recomputes them)
+        if not Assignment.objects.filter(id=pk).exists():
+            return HttpResponseNotFound("Assignment not found")
+        if request.GET.get('recount', "").lower() in ('true', 'yes'):
+            rebuild_assignment_stats(pk)
+        return Response(get_assignment_stats(pk))
+
+    @action(detail=True, url_path='export.zip')
+    def export_zip(self, request, pk=None):
+        # zip of every current submission laid out as student/filename, streamed as it is built: /api/assignments/<id>/export.zip
+        try:
+            assignment = Assignment.objects.get(id=pk)
+        except Assignment.DoesNotExist:
+            return HttpResponseNotFound("Assignment not found")
+        # DRF wraps the request, so look at Django's own to tell ASGI from WSGI
+        if isinstance(request._request, ASGIRequest):
+            stream = stream_assignment_zip(assignment.id)
+        else:
+            stream = iter_assignment_zip(assignment.id)
+        response = StreamingHttpResponse(stream, content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="assignment-{assignment.id}.zip"'
+        return response
 
     @action(detail=True)
     def submissions(self, request, pk=None):
@@ -225,47 +316,241 @@ class AssignmentView(viewsets.ModelViewSet):
         if student is None:
             # list all submissions for assignment: /api/assignments/<id>/submissions
             if requester_id and should_restrict_submission_access(pk, requester_id):
-                queryset = AssignmentSubmission.objects.filter(assignment__id=pk, user__id=requester_id)
-                serializer = SubmissionSerializer(queryset, many=True)
-                return Response(serializer.data)
+                queryset = AssignmentSubmission.objects.with_details().filter(assignment__id=pk, user__id=requester_id)
+                return self.list_response(queryset, SubmissionSerializer)
 
-            queryset = AssignmentSubmission.objects.filter(assignment__id=pk)
-            serializer = SubmissionSerializer(queryset, many=True)
-            return Response(serializer.data)
+            queryset = AssignmentSubmission.objects.with_details().filter(assignment__id=pk)
+            return self.list_response(queryset, SubmissionSerializer)
         elif not current:
             # list assignment submissions for given student: /api/assignments/<id>/submissions?student=<id>
             if requester_id and student != requester_id:
                 if should_restrict_submission_access(pk, requester_id, student):
                     return Response({'error': 'Access restricted due to active extension'}, status=403)
             
-            queryset = AssignmentSubmission.objects.filter(assignment__id=pk, user__id=student)
-            serializer = SubmissionSerializer(queryset, many=True)
-            return Response(serializer.data)
+            queryset = AssignmentSubmission.objects.with_details().filter(assignment__id=pk, user__id=student)
+            return self.list_response(queryset, SubmissionSerializer)
         else:
             # show current assignment submission for given student: /api/assignments/<id>/submissions?student=<id>&current=true
             if requester_id and student != requester_id:
                 if should_restrict_submission_access(pk, requester_id, student):
                     return Response({'error': 'Access restricted due to active extension'}, status=403)
             
-            queryset = AssignmentSubmission.objects.filter(assignment__id=pk, user__id=student, is_current=True)
-            serializer = SubmissionSerializer(queryset, many=True)
-            return Response(serializer.data)
+            queryset = AssignmentSubmission.objects.with_details().filter(assignment__id=pk, user__id=student, is_current=True)
+            return self.list_response(queryset, SubmissionSerializer)
 
 class SubmissionView(viewsets.ModelViewSet):
     serializer_class = SubmissionSerializer
-    queryset = AssignmentSubmission.objects.all()
+    queryset = AssignmentSubmission.objects.with_details()
+
+    @conditional(submission_version)
+    def retrieve(self, request, pk=None):
+        # submission with its files and comments: /api/submit/<id>
+        # answers 304 to If-None-Match / If-Modified-Since when nothing changed
+        return super().retrieve(request, pk=pk)
+
+    @action(detail=False, methods=['post'])
+    def upload(self, request):
+        # create a new current submission with all its files in one transaction: /api/submit/upload
+        # { assignment: id, user: id, files: [{ name, content }, ...] }
+        upload = SubmissionUploadSerializer(data=request.data)
+        if not upload.is_valid():
+            return Response(upload.errors, status=400)
+        data = upload.validated_data
+        submission = create_submission(
+            data['assignment'], data['user'], ((f['name'], f['content']) for f in data['files'])
+        )
+        submission = AssignmentSubmission.objects.with_details().get(id=submission.id)
+        return Response(SubmissionSerializer(submission).data, status=201)
+
+    @action(detail=False, methods=['post'], url_path='upload/archive')
+    def upload_archive(self, request):
+        # create a new current submission from a zip or tar project: /api/submit/upload/archive
+        # multipart form with assignment, user and archive; binary and oversized members are skipped
+        upload = SubmissionArchiveUploadSerializer(data=request.data)
+        if not upload.is_valid():
+            return Response(upload.errors, status=400)
+        data = upload.validated_data
+        skipped = []
+        try:
+            file_rows = store_files(iter_archive_files(data['archive'], skipped))
+        except ArchiveError as e:
+            return Response({'error': str(e)}, status=400)
+        if not file_rows:
+            return Response({'error': 'Archive contains no text files', 'skipped': skipped}, status=400)
+        submission = save_submission(data['assignment'], data['user'], file_rows)
+        submission = AssignmentSubmission.objects.with_details().get(id=submission.id)
+        return Response({'submission': SubmissionSerializer(submission).data, 'skipped': skipped}, status=201)
+
+    def versions_to_diff(self, pk, against):
+        """Load a submission and the version to compare it with, or return an error response."""
+        try:
+            submission = AssignmentSubmission.objects.prefetch_related('files').get(id=pk)
+        except AssignmentSubmission.DoesNotExist:
+            return None, None, HttpResponseNotFound("Submission not found")
+        if against is None:
+            previous = previous_version(submission)
+            if previous is None:
+                return None, None, HttpResponseNotFound("No earlier version of this submission")
+            against = previous.id
+        try:
+            other = AssignmentSubmission.objects.prefetch_related('files').get(id=against)
+        except AssignmentSubmission.DoesNotExist:
+            return None, None, HttpResponseNotFound(f"Submission {against} not found")
+        if (other.assignment_id, other.user_id) != (submission.assignment_id, submission.user_id) or other.id == submission.id:
+            return None, None, Response({'error': "against must be another version of the same student's submission"}, status=400)
+        return submission, other, None
+
+    @action(detail=True)
+    def diff(self, request, pk=None):
+        # line diff from another version of the same student's submission: /api/submit/<id>/diff?against=<id>&context=<lines>
+        # against defaults to the previous version; "comments" previews where its file comments would land on this one
+        try:
+            against = request.GET.get('against', None)
+            against = int(against) if against else None
+            context = int(request.GET.get('context', DEFAULT_DIFF_CONTEXT))
+        except ValueError:
+            return Response({'error': 'against and context must be integers'}, status=400)
+        if context < 0:
+            return Response({'error': 'context must not be negative'}, status=400)
+        submission, other, error = self.versions_to_diff(pk, against)
+        if error is not None:
+            return error
+        result = diff_submissions(other, submission, context)
+        return Response({'submission': submission.id, 'against': other.id, **result})
+
+    @action(detail=True, methods=['post'], url_path='comments/remap')
+    def remap_comments(self, request, pk=None):
+        # move another version's file comments onto the matching lines of this one: /api/submit/<id>/comments/remap
+        # { against: id } (default: the previous version), which must be older than this one, so comments only move forward;
+        # comments on deleted lines or files stay where they are
+        against = request.data.get('against', None)
+        if against is not None and (not isinstance(against, int) or isinstance(against, bool)):
+            return Response({'error': 'against must be a submission id'}, status=400)
+        submission, other, error = self.versions_to_diff(pk, against)
+        if error is not None:
+            return error
+        # Same order as previous_version: by submission time, then by id
+        if (other.submitted_at, other.id) >= (submission.submitted_at, submission.id):
+            return Response({'error': 'against must be an earlier version of this submission'}, status=400)
+        result = move_comments(other, submission)
+        return Response({'submission': submission.id, 'against': other.id, **result})
+
+    @action(detail=True, url_path='comments/tree')
+    def comment_tree(self, request, pk=None):
+        # threaded comments with author names: /api/submit/<id>/comments/tree?file=<id>&replies=<max replies per comment>
+        # next page of replies to one comment: /api/submit/<id>/comments/tree?parent=<id>&offset=<n>&limit=<n>
+        try:
+            file_id = request.GET.get('file', None)
+            file_id = int(file_id) if file_id else None
+            replies_limit = request.GET.get('replies', None)
+            replies_limit = int(replies_limit) if replies_limit else None
+            parent_id = request.GET.get('parent', None)
+            parent_id = int(parent_id) if parent_id else None
+            offset = int(request.GET.get('offset', 0))
+            limit = request.GET.get('limit', None)
+            limit = int(limit) if limit else None
+        except ValueError:
+            return Response({'error': 'file, replies, parent, offset and limit must be integers'}, status=400)
+
+        if offset < 0 or any(n is not None and n < 0 for n in (limit, replies_limit)):
+            return Response({'error': 'replies, offset and limit must not be negative'}, status=400)
+        if not AssignmentSubmission.objects.filter(id=pk).exists():
+            return HttpResponseNotFound(f"Submission {pk} not found")
+
+        if parent_id is not None:
+            return Response(get_reply_page(pk, parent_id, offset, limit))
+        return Response(get_comment_tree(pk, file_id, replies_limit))
+
+@require_GET
+def comment_events(request, pk):
+    # live comment create/update/delete events for a submission as Server-Sent Events: /api/submit/<id>/events
+    # reconnecting clients resume after the Last-Event-ID header (or ?last_event_id=<id>)
+    if not AssignmentSubmission.objects.filter(id=pk).exists():
+        return HttpResponseNotFound(f"Submission {pk} not found")
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        after_id = int(last_event_id) if last_event_id else latest_event_id()
+    except ValueError:
+        return HttpResponseBadRequest("Last-Event-ID must be an integer")
+    if isinstance(request, ASGIRequest):
+        stream = stream_comment_events(pk, after_id)
+    else:
+        stream = iter_comment_events(pk, after_id)
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
 class CommentsView(viewsets.ModelViewSet):
     serializer_class = CommentSerializer
-    queryset = AssignmentSubmissionComment.objects.all()
+    queryset = AssignmentSubmissionComment.objects.select_related('user')
 
 class SubmissionFileView(viewsets.ModelViewSet):
     serializer_class = SubmissionFileSerializer
     queryset = AssignmentSubmissionFile.objects.all()
 
+    def perform_create(self, serializer):
+        submission_file = serializer.save()
+        lint_submission_file.enqueue(submission_file.id)
+
+    def perform_update(self, serializer):
+        old_hash = serializer.instance.content_hash
+        submission_file = serializer.save()
+        if submission_file.content_hash != old_hash:
+            # New content: drop findings for the old content and lint again
+            AssignmentSubmissionComment.objects.filter(submission_file=submission_file, comment_type='linter').delete()
+            AssignmentSubmissionFile.objects.filter(id=submission_file.id).update(linted=False)
+            lint_submission_file.enqueue(submission_file.id)
+
+    @action(detail=True)
+    def download(self, request, pk=None):
+        # stream raw file body from the blob store: /api/addfile/<id>/download
+        submission_file = self.get_object()
+        try:
+            blob = open_blob(submission_file.content_hash)
+        except FileNotFoundError:
+            return HttpResponseNotFound("File content not found")
+        # FileResponse hands the open file to the server's file wrapper (sendfile where supported)
+        return FileResponse(blob, as_attachment=True, filename=submission_file.name, content_type='text/plain; charset=utf-8')
+
+    @action(detail=True)
+    def lines(self, request, pk=None):
+        # slice of a file by 1-based inclusive line numbers: /api/addfile/<id>/lines?start=<n>&end=<n>
+        submission_file = self.get_object()
+        try:
+            start = int(request.GET.get('start', 1))
+            end = int(request.GET.get('end', submission_file.line_count))
+        except ValueError:
+            return Response({'error': 'start and end must be integers'}, status=400)
+        if start < 1 or end < start:
+            return Response({'error': 'Invalid line range'}, status=400)
+        end = min(end, submission_file.line_count)
+        return Response({
+            'id': submission_file.id,
+            'start': start,
+            'end': end,
+            'line_count': submission_file.line_count,
+            'lines': submission_file.read_lines(start, end),
+        })
+
+    @action(detail=True)
+    def comments(self, request, pk=None):
+        # comment threads overlapping a line window: /api/addfile/<id>/comments?start=<n>&end=<n>
+        try:
+            start = int(request.GET['start'])
+            end = int(request.GET['end'])
+        except (KeyError, ValueError):
+            return Response({'error': 'start and end are required integers'}, status=400)
+        if end < start:
+            return Response({'error': 'Invalid line range'}, status=400)
+        if not AssignmentSubmissionFile.objects.filter(id=pk).exists():
+            return HttpResponseNotFound("File not found")
+        return Response(get_comments_in_window(pk, start, end))
+
 class AssignmentGroupView(viewsets.ModelViewSet):
     serializer_class = AssignmentGroupSerializer
-    queryset = AssignmentGroup.objects.all()
+    queryset = AssignmentGroup.objects.prefetch_related('users')
 
 
 
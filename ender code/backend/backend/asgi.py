@@ -3,6 +3,12 @@ ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Under ASGI the URL configuration defaults to ``backend.asgi_urls``, which
+serves the hottest read endpoints from async views. Run it with e.g.
+``uvicorn backend.asgi:application --workers 4`` (see the README).
+``DJANGO_ASGI`` tells the settings they are served under ASGI, where
+backend/settings_production.py turns persistent database connections off.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
@@ -12,5 +18,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+os.environ.setdefault('DJANGO_ROOT_URLCONF', 'backend.asgi_urls')
+os.environ['DJANGO_ASGI'] = '1'
 
 application = get_asgi_application()
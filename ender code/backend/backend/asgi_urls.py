@@ -0,0 +1,16 @@
+"""
+URL configuration for the ASGI serving mode (selected by backend/asgi.py).
+
+Routes the hottest read endpoints to the async views in api/async_views.py
+and everything else to the regular URL configuration in backend/urls.py.
+"""
+from django.urls import path
+from api import async_views
+from backend import urls
+
+urlpatterns = [
+    path('api/classes/', async_views.class_list),
+    path('api/classes/<int:pk>/assignments/', async_views.class_assignments),
+    path('api/classes/<int:pk>/roster/', async_views.class_roster),
+    path('api/submit/<int:pk>/', async_views.submission_detail),
+] + urls.urlpatterns
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +45,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its total time covers all other middleware (see api/middleware.py)
+    'api.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -51,9 +55,12 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    # Last, because it calls the view itself when a request is profiled
+    'api.middleware.ProfilingMiddleware',
 ]
 
-ROOT_URLCONF = 'backend.urls'
+# backend/asgi.py switches to backend.asgi_urls, which adds async read views
+ROOT_URLCONF = os.environ.get('DJANGO_ROOT_URLCONF', 'backend.urls')
 
 TEMPLATES = [
     {
@@ -84,6 +91,10 @@ DATABASES = {
     }
 }
 
+# PRAGMAs run on every new SQLite connection (see api/sqlite.py); production
+# settings enable WAL and friends in backend/settings_production.py
+SQLITE_PRAGMAS = {}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -121,11 +132,98 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Submission file storage
+# Content-addressed blob store for AssignmentSubmissionFile bodies (see api/blobstore.py)
+
+SUBMISSION_BLOB_ROOT = BASE_DIR / 'blobs'
+
+# Limits for zip/tar project uploads (see api/archives.py); members over the
+# size limit or past the file limit are skipped rather than stored
+SUBMISSION_ARCHIVE_MAX_FILE_SIZE = 1024 * 1024
+SUBMISSION_ARCHIVE_MAX_FILES = 500
+
+# Threads used to compress files for /api/assignments/<id>/export.zip (see api/export.py)
+EXPORT_COMPRESSION_WORKERS = 4
+
+# Linters run on new submission files from the task queue or `manage.py lint_submissions` (see api/linting.py).
+# Maps a file extension to {linter name: command}; the file path is appended to the command.
+SUBMISSION_LINTERS = {
+    '.py': {
+        'pyflakes': [sys.executable, '-m', 'pyflakes'],
+        'pycodestyle': [sys.executable, '-m', 'pycodestyle', '--max-line-length=120'],
+    },
+}
+LINT_WORKERS = 4
+LINT_TIMEOUT = 30
+LINTER_USER_EMAIL = 'linter@localhost'
+
+# Database-backed task queue (see api/taskqueue.py); run workers with `manage.py worker`.
+# Jobs locked longer than TASK_LOCK_TIMEOUT seconds are assumed abandoned and re-run;
+# failed jobs are retried after TASK_RETRY_BACKOFF * 2**(attempt - 1) seconds.
+TASK_LOCK_TIMEOUT = 15 * 60
+TASK_RETRY_BACKOFF = 30
+
+# Live comment streams at /api/submit/<id>/events/ (see api/events.py). Streams poll the
+# CommentEvent table every COMMENT_STREAM_POLL_INTERVAL seconds, send a keepalive after
+# COMMENT_STREAM_HEARTBEAT idle seconds and close after COMMENT_STREAM_TIMEOUT seconds;
+# clients reconnect after COMMENT_STREAM_RETRY milliseconds. Events are kept for
+# COMMENT_EVENT_RETENTION seconds, pruned once every COMMENT_EVENT_PRUNE_EVERY events.
+COMMENT_STREAM_POLL_INTERVAL = 1
+COMMENT_STREAM_HEARTBEAT = 15
+COMMENT_STREAM_TIMEOUT = 5 * 60
+COMMENT_STREAM_RETRY = 3000
+COMMENT_EVENT_RETENTION = 24 * 60 * 60
+COMMENT_EVENT_PRUNE_EVERY = 500
+
+# Request instrumentation (see api/middleware.py): every response gets a Server-Timing
+# header with SQL, serialization, view and render times; requests taking at least SLOW_REQUEST_MS are
+# written as JSON lines to slow_requests.log with their SLOW_REQUEST_TOP_QUERIES most
+# repeated SQL statements.
+SERVER_TIMING_HEADER = True
+SLOW_REQUEST_MS = 500
+SLOW_REQUEST_TOP_QUERIES = 5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'slow_requests': {
+            'class': 'logging.FileHandler',
+            'filename': BASE_DIR / 'slow_requests.log',
+            'formatter': 'message',
+            'delay': True,
+        },
+    },
+    'loggers': {
+        'api.slow_requests': {
+            'handlers': ['slow_requests'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+# On-demand profiling (see api/profiling.py): a request with an X-Profile header or
+# ?profile= parameter from a staff user, or whose value is PROFILING_TOKEN, is run under
+# cProfile and tracemalloc and saved to PROFILING_DIR. An empty token allows staff only.
+PROFILING_TOKEN = os.environ.get('DJANGO_PROFILING_TOKEN', '')
+PROFILING_DIR = BASE_DIR / 'profiles'
+PROFILING_TOP_ALLOCATIONS = 25
+PROFILING_TRACEBACK_FRAMES = 1
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+REST_FRAMEWORK = {
+    # Opt-in: lists are only paginated when ?page_size= or ?cursor= is passed
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.OptionalCursorPagination',
+}
+
 CORS_ORIGIN_WHITELIST = [
      'http://localhost:5173'
 ]
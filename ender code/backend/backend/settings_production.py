@@ -0,0 +1,53 @@
+"""
+Production settings for backend project.
+
+Use with DJANGO_SETTINGS_MODULE=backend.settings_production. Everything not
+overridden here comes from backend/settings.py.
+
+Required environment: DJANGO_SECRET_KEY. Optional: DJANGO_ALLOWED_HOSTS
+(comma separated, default localhost). DJANGO_ASGI is set by backend/asgi.py.
+"""
+
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES
+
+DEBUG = False
+
+try:
+    SECRET_KEY = os.environ['DJANGO_SECRET_KEY']
+except KeyError:
+    raise ImproperlyConfigured('Set DJANGO_SECRET_KEY to use the production settings')
+
+ALLOWED_HOSTS = os.environ.get('DJANGO_ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
+
+DATABASES = {'default': {
+    **DATABASES['default'],
+    # Under WSGI, keep connections open between requests instead of reconnecting
+    # every time. Persistent connections must be disabled in async mode (see
+    # Django's database docs): under ASGI a request's sync code runs on whichever
+    # thread is free, so connections would be left open on threads that never close them.
+    'CONN_MAX_AGE': 0 if os.environ.get('DJANGO_ASGI') else 600,
+    'CONN_HEALTH_CHECKS': True,
+    'OPTIONS': {
+        # Take the write lock when a transaction starts, so a reader that later
+        # writes waits for busy_timeout instead of failing with "database is locked"
+        'transaction_mode': 'IMMEDIATE',
+    },
+}}
+
+# Applied to every new connection by api/sqlite.py. WAL lets readers run while a
+# write is in progress; with WAL, synchronous=NORMAL is still safe against
+# corruption and only fsyncs at checkpoints. mmap_size (bytes) and cache_size
+# (negative: KiB) keep hot pages in memory, and busy_timeout (ms) makes writers
+# wait for the lock instead of failing.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+}
@@ -32,5 +32,6 @@ router.register(r'addcomment', views.CommentsView, 'comment')
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/submit/<int:pk>/events/', views.comment_events, name='submit-events'),
     path('api/', include(router.urls)),
 ]
@@ -8,6 +8,34 @@ import styles from "../styles/CodeViewer.module.css";
 // - code, displayedUserId, displayedUserName, submissionId,
 //   submissionFileId, currentUserId.
 
+// Helpers for applying live comment events to the nested comment list.
+function insertComment(list, comment) {
+  if (!comment.parent) return [...list, comment];
+  return list.map((c) =>
+    c.id === comment.parent
+      ? { ...c, replies: [...(c.replies || []), comment] }
+      : { ...c, replies: insertComment(c.replies || [], comment) }
+  );
+}
+
+function hasComment(list, id) {
+  return list.some((c) => c.id === id || hasComment(c.replies || [], id));
+}
+
+function updateComment(list, id, changes) {
+  return list.map((c) =>
+    c.id === id
+      ? { ...c, ...changes }
+      : { ...c, replies: updateComment(c.replies || [], id, changes) }
+  );
+}
+
+function removeComment(list, id) {
+  return list
+    .filter((c) => c.id !== id)
+    .map((c) => ({ ...c, replies: removeComment(c.replies || [], id) }));
+}
+
 export default function CodeViewer({
   isTeacher,
   code,
@@ -115,6 +143,7 @@ export default function CodeViewer({
             topOffset,
             parent: c.parent,
             user: c.user,
+            userName: c.user_name,
             replies: [],
           };
         });
@@ -145,6 +174,48 @@ export default function CodeViewer({
     fetchComments();
   }, [submissionFileId, submissionId, displayedUserId]);
 
+  // Apply comments added, edited or deleted by others as they happen
+  useEffect(() => {
+    if (!submissionFileId || !submissionId) return;
+
+    const source = new EventSource(`/api/submit/${submissionId}/events/`);
+    const toComment = (c) => ({
+      id: c.id,
+      text: c.comment,
+      timestamp: c.updated_at,
+      startLine: c.start_line,
+      endLine: c.end_line,
+      startOffset: c.start_offset,
+      endOffset: c.end_offset,
+      topOffset: c.start_line * lineHeight,
+      parent: c.parent,
+      user: c.user,
+      userName: c.user_name,
+      replies: [],
+    });
+
+    source.addEventListener("create", (e) => {
+      const c = JSON.parse(e.data);
+      if (c.submission_file !== submissionFileId) return;
+      setComments((prev) =>
+        hasComment(prev, c.id) ? prev : insertComment(prev, toComment(c))
+      );
+    });
+    source.addEventListener("update", (e) => {
+      const c = JSON.parse(e.data);
+      if (c.submission_file !== submissionFileId) return;
+      const changes = toComment(c);
+      delete changes.replies;
+      setComments((prev) => updateComment(prev, c.id, changes));
+    });
+    source.addEventListener("delete", (e) => {
+      const { id } = JSON.parse(e.data);
+      setComments((prev) => removeComment(prev, id));
+    });
+
+    return () => source.close();
+  }, [submissionFileId, submissionId]);
+
   // If a specific comment was selected from elsewhere, scroll to it and highlight
   useEffect(() => {
     if (!selectedCommentId || comments.length === 0) return;
@@ -279,6 +350,7 @@ export default function CodeViewer({
             : data.start_line * lineHeight,
         parent: null,
         user: data.user,
+        userName: data.user_name,
         replies: [],
       };
 
@@ -333,6 +405,7 @@ export default function CodeViewer({
                 : data.start_line * lineHeight,
             parent: data.parent,
             user: data.user,
+            userName: data.user_name,
             replies: [],
           };
 
@@ -587,10 +660,10 @@ export default function CodeViewer({
                     })
                   }
                 >
-                  {names[c.user]}
+                  {c.userName || names[c.user]}
                 </span>
               ) : (
-                names[c.user]
+                c.userName || names[c.user]
               )}
             </p>
 
@@ -632,10 +705,10 @@ export default function CodeViewer({
                             })
                           }
                         >
-                          {names[r.user]}
+                          {r.userName || names[r.user]}
                         </span>
                       ) : (
-                        names[r.user]
+                        r.userName || names[r.user]
                       )}
                     </p>
 
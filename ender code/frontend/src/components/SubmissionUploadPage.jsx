@@ -112,62 +112,24 @@ export default function SubmissionUploadPage() {
     setError("");
 
     try {
-      let submissionIdToUse;
-
-      if (!existingSubmission) {
-        const payloadSub = {
-          assignment: parseInt(assignmentId, 10),
-          user: loggedInUser.id,
-          is_current: true,
-        };
-        const resCreate = await fetch("http://127.0.0.1:8000/api/submit/", {
-          method: "POST",
-          headers: { "Content-Type": "application/json" },
-          body: JSON.stringify(payloadSub),
-        });
-        if (!resCreate.ok) {
-          throw new Error("Failed to create submission");
-        }
-        const newSub = await resCreate.json();
-        submissionIdToUse = newSub.id;
-        setExistingSubmission(newSub);
-      } else {
-        submissionIdToUse = existingSubmission.id;
-      }
-
-      if (existingFile) {
-        const payloadFile = {
-          submission: submissionIdToUse,
-          name: fileName,
-          content: fileContent,
-        };
-        const resUpdate = await fetch(`http://127.0.0.1:8000/api/addfile/${existingFile.id}/`, {
-          method: "PUT",
-          headers: { "Content-Type": "application/json" },
-          body: JSON.stringify(payloadFile),
-        });
-        if (!resUpdate.ok) {
-          throw new Error("Failed to replace file");
-        }
-        const updatedFile = await resUpdate.json();
-        setExistingFile(updatedFile);
-      } else {
-        const payloadFile = {
-          submission: submissionIdToUse,
-          name: fileName,
-          content: fileContent,
-        };
-        const resCreateFile = await fetch("http://127.0.0.1:8000/api/addfile/", {
-          method: "POST",
-          headers: { "Content-Type": "application/json" },
-          body: JSON.stringify(payloadFile),
-        });
-        if (!resCreateFile.ok) {
-          throw new Error("Failed to upload file");
-        }
-        const newFile = await resCreateFile.json();
-        setExistingFile(newFile);
+      // One request creates the new current version with its file; earlier versions are kept as history
+      const payload = {
+        assignment: parseInt(assignmentId, 10),
+        user: loggedInUser.id,
+        files: [{ name: fileName, content: fileContent }],
+      };
+      const res = await fetch("http://127.0.0.1:8000/api/submit/upload/", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify(payload),
+      });
+      if (!res.ok) {
+        throw new Error(existingSubmission ? "Failed to replace submission" : "Failed to upload submission");
       }
+      const newSub = await res.json();
+      setExistingSubmission(newSub);
+      // The response lists file metadata only; the content is what was just uploaded
+      setExistingFile(newSub.files.length > 0 ? { ...newSub.files[0], content: fileContent } : null);
     } catch (err) {
       console.error(err);
       setError(err.message);